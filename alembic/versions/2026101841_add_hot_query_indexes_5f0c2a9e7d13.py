@@ -0,0 +1,72 @@
+"""add_hot_query_indexes
+
+Revision ID: 5f0c2a9e7d13
+Revises: 34d6162bae8c
+Create Date: 2026-10-18 09:41:12.318204
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5f0c2a9e7d13"
+down_revision = "34d6162bae8c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_animal_user_association_user_id_animal_id",
+            "animal_user_association",
+            ["user_id", "animal_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_animal_user_association_animal_id",
+            "animal_user_association",
+            ["animal_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_animal_weight_history_animal_id_change_date",
+            "animal_weight_history",
+            ["animal_id", "change_date"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_animal_log_animal_id_date_activity",
+            "animal_log",
+            ["animal_id", "date", "activity"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_animal_log_animal_id_date_activity",
+            table_name="animal_log",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_animal_weight_history_animal_id_change_date",
+            table_name="animal_weight_history",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_animal_user_association_animal_id",
+            table_name="animal_user_association",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_animal_user_association_user_id_animal_id",
+            table_name="animal_user_association",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,42 @@
+"""add_animal_log_idempotency_key
+
+Revision ID: b91e4c07d2a6
+Revises: 5f0c2a9e7d13
+Create Date: 2026-10-18 11:52:40.105388
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b91e4c07d2a6"
+down_revision = "5f0c2a9e7d13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "animal_log",
+        sa.Column("idempotency_key", sa.String(length=128), nullable=True),
+    )
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_animal_log_animal_id_idempotency_key",
+            "animal_log",
+            ["animal_id", "idempotency_key"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_animal_log_animal_id_idempotency_key",
+            table_name="animal_log",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("animal_log", "idempotency_key")
@@ -0,0 +1,38 @@
+"""add_animal_log_daily
+
+Revision ID: e3a7c61f4b28
+Revises: b91e4c07d2a6
+Create Date: 2026-10-18 12:58:03.774120
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e3a7c61f4b28"
+down_revision = "b91e4c07d2a6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # filled by `python -m app.backfill_log_daily`
+    op.create_table(
+        "animal_log_daily",
+        sa.Column("animal_id", sa.UUID(as_uuid=False), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column(
+            "activity",
+            postgresql.ENUM(name="activitytypes", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["animal_id"], ["animal.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("animal_id", "day", "activity"),
+    )
+
+
+def downgrade():
+    op.drop_table("animal_log_daily")
@@ -1,38 +1,53 @@
 import time
+import uuid
 from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+from typing import Any
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import queries
 from app.core import config, security
-from app.core.session import async_session
-from app.models import User
+from app.core.cache import (
+    ownership_cache,
+    recent_writers,
+    user_active_cache,
+    user_cache,
+)
+from app.core.session import async_session, replicas
+from app.models import AnimalUserAssociation, User
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="auth/access-token")
 
 
+@dataclass(slots=True, frozen=True)
+class Principal:
+    """Authenticated user built from verified token claims only."""
+
+    id: str
+    issued_at: int
+    expires_at: int
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
 
 
-async def get_current_user(
-    session: AsyncSession = Depends(get_session), token: str = Depends(reusable_oauth2)
-) -> User:
+async def get_access_token_payload(
+    token: str = Depends(reusable_oauth2),
+) -> security.JWTTokenPayload:
     try:
-        payload = jwt.decode(
-            token, config.settings.SECRET_KEY, algorithms=[security.JWT_ALGORITHM]
-        )
+        token_data = security.decode_jwt_token(token)
     except jwt.DecodeError:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials.",
         )
-    # JWT guarantees payload will be unchanged (and thus valid), no errors here
-    token_data = security.JWTTokenPayload(**payload)
 
     if token_data.refresh:
         raise HTTPException(
@@ -45,10 +60,131 @@ async def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials, token expired or not yet valid",
         )
+    return token_data
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
+    token_data: security.JWTTokenPayload = Depends(get_access_token_payload),
+) -> User:
+    user = user_cache.get(str(token_data.sub))
+    if user is None:
+        result = await session.execute(
+            queries.USER_BY_ID, {"user_id": str(token_data.sub)}
+        )
+        user = result.scalars().first()
+
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found.")
+        # keep a detached snapshot, every request works on its own merged copy
+        session.expunge(user)
+        user_cache.set(user.id, user)
+
+    if not user.active:
+        raise HTTPException(status_code=403, detail="Inactive user.")
+    session.info["user_id"] = user.id
+    return await session.merge(user, load=False)
+
+
+async def get_current_superuser(
+    current_user: User = Depends(get_current_user),
+) -> User:
+    if current_user.email != config.settings.FIRST_SUPERUSER_EMAIL:
+        raise HTTPException(status_code=403, detail="Not enough privileges.")
+    return current_user
+
 
-    result = await session.execute(select(User).where(User.id == token_data.sub))
-    user = result.scalars().first()
+async def get_current_principal(
+    session: AsyncSession = Depends(get_session),
+    token_data: security.JWTTokenPayload = Depends(get_access_token_payload),
+) -> Principal:
+    """Claims-only alternative to `get_current_user`, does not load the User row.
+
+    `User.active` is re-checked at most every PRINCIPAL_REVOCATION_TTL_SECONDS,
+    so deactivated users are locked out within that window.
+    """
+    user_id = str(token_data.sub)
+    active = user_active_cache.get(user_id)
+    if active is None:
+        result = await session.execute(queries.USER_ACTIVE_BY_ID, {"user_id": user_id})
+        active = result.scalars().first()
+
+        if active is None:
+            raise HTTPException(status_code=404, detail="User not found.")
+        user_active_cache.set(user_id, active)
+
+    if not active:
+        raise HTTPException(status_code=403, detail="Inactive user.")
+    session.info["user_id"] = user_id
+    return Principal(
+        id=user_id,
+        issued_at=token_data.issued_at,
+        expires_at=token_data.expires_at,
+    )
+
+
+def owns_animal(user_id: str, animal_id: Any) -> ColumnElement[bool]:
+    """EXISTS clause answered from the (user_id, animal_id) association index.
+
+    `animal_id` may be a value or a column, e.g. `AnimalLog.animal_id`.
+    """
+    return exists().where(
+        AnimalUserAssociation.user_id == user_id,
+        AnimalUserAssociation.animal_id == animal_id,
+    )
+
+
+async def require_owned_animal(
+    animal_id: str,
+    session: AsyncSession = Depends(get_session),
+    principal: Principal = Depends(get_current_principal),
+) -> str:
+    """Returns `animal_id` if the current user owns the animal, 404 otherwise.
+
+    Runs one EXISTS query and never loads the Animal row. FastAPI caches
+    dependency results per request, so the check runs at most once per request,
+    and positive answers are kept in `ownership_cache` across requests.
+    """
+    try:
+        animal_id = str(uuid.UUID(animal_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Animal not found")
+
+    if ownership_cache.get((principal.id, animal_id)):
+        return animal_id
+
+    result = await session.execute(
+        queries.OWNS_ANIMAL, {"user_id": principal.id, "animal_id": animal_id}
+    )
+    if not result.scalar():
+        raise HTTPException(status_code=404, detail="Animal not found")
+    ownership_cache.set((principal.id, animal_id), True)
+    return animal_id
+
+
+async def get_read_session(
+    session: AsyncSession = Depends(get_session),
+    token_data: security.JWTTokenPayload = Depends(get_access_token_payload),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only handlers, bound to a read replica when possible.
+
+    Falls back to the request's primary session when no replica is configured or
+    healthy, and for READ_YOUR_WRITES_SECONDS after the user's own write so
+    they never read a replica that has not caught up with it yet. Such sessions
+    are flagged with `info["read_your_writes"]`, handlers then skip the response
+    cache which replica reads of other users may have filled. A replica that
+    fails to connect is skipped for DATABASE_REPLICA_RETRY_SECONDS, the session
+    then continues on the primary.
+    """
+    if recent_writers.get(str(token_data.sub)):
+        session.info["read_your_writes"] = True
+        yield session
+        return
+    engine = replicas.pick()
+    if engine is None:
+        yield session
+        return
 
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
-    return user
+    # connects on first statement, responses served from cache never do
+    async with replicas.session(engine) as replica_session:
+        yield replica_session
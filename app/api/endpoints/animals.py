@@ -1,29 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, and_
+import asyncio
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, insert, literal, select, and_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import subqueryload
-from typing import List
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional
 
+from app import queries
 from app.api import deps
-from app.models import Animal, User, AnimalWeightHistory, AnimalLog, ActivityTypes
+from app.core import config, write_behind
+from app.core.invalidation import publish
+from app.core.response_cache import (
+    CachedResponse,
+    animals_tag,
+    log_tag,
+    response_cache,
+    weight_tag,
+)
+from app.core.session import async_session
+from app.models import (
+    Animal,
+    User,
+    AnimalWeightHistory,
+    AnimalLog,
+    AnimalLogDaily,
+    ActivityTypes,
+    AnimalUserAssociation,
+)
 from app.schemas.requests import (
     AnimalCreateRequest,
     AnimalUpdateRequest,
     AnimalWeightHistoryCreateRequest,
-    AnimalLogCreateRequest
+    AnimalLogCreateRequest,
+    AnimalLogBulkItemRequest,
+)
+from app.api.endpoints.utils import (
+    TimeBucket,
+    TimeUnit,
+    cached_response,
+    collection_fingerprint,
+    decode_cursor,
+    encode_cursor,
+    get_start_date,
+    make_etag,
+    not_modified,
 )
-from app.api.endpoints.utils import TimeUnit
 from app.schemas.responses import (
     AnimalBaseResponse,
     AnimalExtendedResponse,
-    AnimalWeightHistoryResponse, AnimalLogResponse
+    AnimalPageResponse,
+    AnimalWeightHistoryResponse,
+    AnimalWeightHistoryBulkResponse,
+    AnimalWeightHistoryPageResponse,
+    AnimalWeightBucketResponse,
+    AnimalWeightSeriesResponse,
+    AnimalLogResponse,
+    AnimalLogAcceptedResponse,
+    AnimalLogExportResponse,
+    AnimalLogPageResponse,
+    AnimalLogSummaryResponse,
+    AnimalLogBulkResponse,
+    AnimalLogBulkItemResponse,
+    BulkItemErrorResponse,
 )
-from app.utils.services import update_record
-from datetime import datetime
-from datetime import datetime, timedelta
+from app.utils.services import update_log_daily, update_record
 
 router = APIRouter()
 
+# rows fetched from the server-side cursor per round trip by log export
+LOG_EXPORT_BATCH_SIZE = 500
+
 
 @router.post("/create", response_model=AnimalBaseResponse, status_code=201)
 async def create_new_animal(
@@ -42,6 +93,7 @@ async def create_new_animal(
     animal.owners.append(current_user)
 
     session.add(animal)
+    publish(session, "user_animals", current_user.id)
     await session.commit()
     return animal
 
@@ -50,39 +102,99 @@ async def create_new_animal(
 async def delete_animal(
     animal_id: str,
     session: AsyncSession = Depends(deps.get_session),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
 ):
     """Deletes animal. Only for logged users."""
 
     result = await session.execute(
         select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
+        .options(joinedload(Animal.owners))
+        .where(deps.owns_animal(current_user.id, Animal.id))
         .where(Animal.id == animal_id)
     )
-    animal = result.scalars().first()
+    animal = result.unique().scalars().first()
     if animal is None:
         raise HTTPException(status_code=404, detail="Animal not found")
 
     await session.delete(animal)
+    publish(session, "animal", animal.id)
+    for owner in animal.owners:
+        publish(session, "user_animals", owner.id)
     await session.commit()
     return animal
 
 
-@router.get("/all", response_model=list[AnimalBaseResponse], status_code=200)
+@router.get("/all", response_model=AnimalPageResponse, status_code=200)
 async def get_all_animals(
-    session: AsyncSession = Depends(deps.get_session),
-    current_user: User = Depends(deps.get_current_user),
+    request: Request,
+    limit: int = Query(
+        config.settings.PAGINATION_DEFAULT_LIMIT,
+        ge=1,
+        le=config.settings.PAGINATION_MAX_LIMIT,
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor of previous page"),
+    session: AsyncSession = Depends(deps.get_read_session),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
 ):
-    """Returns all animals. Only for logged users."""
+    """Returns all animals, oldest first. Only for logged users."""
 
-    result = await session.execute(
+    key = await response_cache.key(
+        [animals_tag(current_user.id)], "animals", current_user.id, limit, cursor
+    )
+    # replicas may have refilled the entry with rows older than the user's write
+    if not session.info.get("read_your_writes") and (
+        entry := await response_cache.get(key)
+    ):
+        return cached_response(request, entry)
+
+    owned = Animal.owners.any(id=current_user.id)
+    # owners are embedded, so co-owners added, deleted or updated change the page
+    animals_fingerprint = (
+        select(func.count(), func.max(Animal.updated_at), func.sum(Animal.version))
+        .where(owned)
+        .subquery()
+    )
+    owners_fingerprint = (
+        select(func.count(), func.max(User.updated_at), func.sum(User.version))
+        .select_from(AnimalUserAssociation)
+        .join(User, User.id == AnimalUserAssociation.user_id)
+        .where(AnimalUserAssociation.animal_id.in_(select(Animal.id).where(owned)))
+        .subquery()
+    )
+    # one row each, joined to read both in one statement
+    fingerprint = await session.execute(
+        select(animals_fingerprint, owners_fingerprint).select_from(
+            animals_fingerprint.join(owners_fingerprint, literal(True))
+        )
+    )
+    etag = make_etag("animals", tuple(fingerprint.one()), limit, cursor)
+    if cached := not_modified(request, etag):
+        return cached
+
+    query = (
         select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
+        .options(selectinload(Animal.owners))
+        .where(owned)
+        .order_by(Animal.created_at, Animal.id)
+        .limit(limit + 1)
     )
+    if cursor is not None:
+        query = query.where(
+            tuple_(Animal.created_at, Animal.id) > decode_cursor(cursor)
+        )
+
+    result = await session.execute(query)
     animals = result.scalars().all()
-    return animals
+
+    next_cursor = None
+    if len(animals) > limit:
+        animals = animals[:limit]
+        next_cursor = encode_cursor(animals[-1].created_at, animals[-1].id)
+
+    page = AnimalPageResponse(items=animals, next_cursor=next_cursor)
+    entry = CachedResponse(etag, page.model_dump_json().encode())
+    await response_cache.set(key, entry)
+    return cached_response(request, entry)
 
 
 # ------------------
@@ -97,17 +209,22 @@ async def update_animal(
     animal_id: str,
     animal_update: AnimalUpdateRequest,
     session: AsyncSession = Depends(deps.get_session),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
 ):
     """Updates animal. Only for logged users."""
 
     result = await session.execute(
         select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
+        .options(joinedload(Animal.owners))
+        .where(deps.owns_animal(current_user.id, Animal.id))
         .where(Animal.id == animal_id)
     )
-    animal = result.scalars().first()
+    animal = result.unique().scalars().first()
+    if animal is None:
+        raise HTTPException(status_code=404, detail="Animal not found")
+
+    for owner in animal.owners:
+        publish(session, "user_animals", owner.id)
     new_values = animal_update.model_dump(exclude_unset=True)
     await update_record(session, animal, new_values)
     return animal
@@ -122,30 +239,19 @@ async def update_animal(
     "/weight/{animal_id}", response_model=AnimalWeightHistoryResponse, status_code=200
 )
 async def add_weight(
-    animal_id: str,
     weight_history_create: AnimalWeightHistoryCreateRequest,
+    animal_id: str = Depends(deps.require_owned_animal),
     session: AsyncSession = Depends(deps.get_session),
-    current_user: User = Depends(deps.get_current_user),
 ):
     """Adds weight to animal. Only for logged users."""
 
-    result = await session.execute(
-        select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
-        .where(Animal.id == animal_id)
-    )
-    animal = result.scalars().first()
-
-    if animal is None:
-        raise HTTPException(status_code=404, detail="Animal not found")
-
     weight_history = AnimalWeightHistory(
-        **weight_history_create.model_dump(), animal_id=animal.id
+        **weight_history_create.model_dump(), animal_id=animal_id
     )
     naive_change_date = weight_history_create.change_date.replace(tzinfo=None)
     weight_history.change_date = naive_change_date
     session.add(weight_history)
+    publish(session, "weight", animal_id)
 
     await session.commit()
 
@@ -156,6 +262,57 @@ async def add_weight(
     )
 
 
+def format_validation_errors(error: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(loc) for loc in e['loc']) or 'item'}: {e['msg']}"
+        for e in error.errors()
+    ]
+
+
+@router.post(
+    "/weight/{animal_id}/bulk",
+    response_model=AnimalWeightHistoryBulkResponse,
+    status_code=200,
+)
+async def add_weight_bulk(
+    items: List[Any] = Body(max_length=config.settings.BULK_INGEST_MAX_ITEMS),
+    animal_id: str = Depends(deps.require_owned_animal),
+    session: AsyncSession = Depends(deps.get_session),
+):
+    """Adds many weights to animal in one transaction, invalid items are skipped
+    and reported by index. Only for logged users."""
+
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            weight_history_create = AnimalWeightHistoryCreateRequest.model_validate(
+                item
+            )
+        except ValidationError as e:
+            errors.append(
+                BulkItemErrorResponse(index=index, errors=format_validation_errors(e))
+            )
+            continue
+        rows.append(
+            {
+                "id": str(uuid.uuid4()),
+                "animal_id": animal_id,
+                "weight": weight_history_create.weight,
+                "change_date": weight_history_create.change_date.replace(tzinfo=None),
+            }
+        )
+
+    # one multi-row INSERT and a single commit for the whole batch
+    if rows:
+        await session.execute(insert(AnimalWeightHistory), rows)
+        publish(session, "weight", animal_id)
+        await session.commit()
+
+    return AnimalWeightHistoryBulkResponse(
+        created=len(rows), ids=[row["id"] for row in rows], errors=errors
+    )
+
+
 # Alter animal weight history with put, this is for that specifc animal weight history
 
 
@@ -165,22 +322,13 @@ async def add_weight(
     status_code=200,
 )
 async def alter_weight(
-    animal_id: str,
     history_id: str,
     weight_history_create: AnimalWeightHistoryCreateRequest,
+    animal_id: str = Depends(deps.require_owned_animal),
     session: AsyncSession = Depends(deps.get_session),
-    current_user: User = Depends(deps.get_current_user),
 ):
     """Adds weight to animal. Only for logged users."""
 
-    result = await session.execute(
-        select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
-        .where(Animal.id == animal_id)
-    )
-    animal = result.scalars().first()
-
     result = await session.execute(
         select(AnimalWeightHistory)
         .where(AnimalWeightHistory.id == history_id)
@@ -199,6 +347,7 @@ async def alter_weight(
     new_values = weight_history_create.model_dump(exclude_unset=True)
     new_values["change_date"] = naive_change_date
 
+    publish(session, "weight", animal_id)
     await update_record(session, weight_history, new_values)
 
     return AnimalWeightHistoryResponse(
@@ -217,20 +366,12 @@ async def alter_weight(
     status_code=200,
 )
 async def delete_weight(
-    animal_id: str,
     history_id: str,
+    animal_id: str = Depends(deps.require_owned_animal),
     session: AsyncSession = Depends(deps.get_session),
-    current_user: User = Depends(deps.get_current_user),
 ):
     """Deletes weight history for an animal. Only for logged users."""
 
-    result = await session.execute(
-        select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
-        .where(Animal.id == animal_id)
-    )
-
     result = await session.execute(
         select(AnimalWeightHistory)
         .where(AnimalWeightHistory.id == history_id)
@@ -248,6 +389,7 @@ async def delete_weight(
     )
 
     await session.delete(weight_history)
+    publish(session, "weight", animal_id)
     await session.commit()
 
     return response
@@ -258,73 +400,243 @@ async def delete_weight(
 
 @router.get(
     "/weight/{animal_id}",
-    response_model=list[AnimalWeightHistoryResponse],
+    response_model=AnimalWeightHistoryPageResponse,
     status_code=200,
 )
 async def get_weight_history(
-    animal_id: str,
+    request: Request,
+    animal_id: str = Depends(deps.require_owned_animal),
     range: int = 1,
     unit: TimeUnit = TimeUnit.DAYS,
-    session: AsyncSession = Depends(deps.get_session),
-    current_user: User = Depends(deps.get_current_user),
+    limit: int = Query(
+        config.settings.PAGINATION_DEFAULT_LIMIT,
+        ge=1,
+        le=config.settings.PAGINATION_MAX_LIMIT,
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor of previous page"),
+    session: AsyncSession = Depends(deps.get_read_session),
 ):
-    """Gets weight history for an animal. Only for logged users."""
+    """Gets weight history for an animal, oldest first. Only for logged users."""
 
-    result = await session.execute(
-        select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
-        .where(Animal.id == animal_id)
+    key = await response_cache.key(
+        [weight_tag(animal_id)], "weight", animal_id, range, unit.value, limit, cursor
     )
+    # replicas may have refilled the entry with rows older than the user's write
+    if not session.info.get("read_your_writes") and (
+        entry := await response_cache.get(key)
+    ):
+        return cached_response(request, entry)
+
+    start_date = get_start_date(range, unit)
+    fingerprint = await session.execute(
+        *queries.weight_fingerprint(animal_id, start_date)
+    )
+    etag = make_etag(
+        "weight",
+        animal_id,
+        tuple(fingerprint.one()),
+        range,
+        unit.value,
+        limit,
+        cursor,
+    )
+    if cached := not_modified(request, etag):
+        return cached
 
     result = await session.execute(
-        select(AnimalWeightHistory).where(AnimalWeightHistory.animal_id == animal_id)
+        *queries.weight_page(
+            animal_id,
+            start_date,
+            limit + 1,
+            decode_cursor(cursor) if cursor is not None else None,
+        )
     )
     weight_history = result.scalars().all()
 
-    if unit == TimeUnit.DAYS:
-        start_date = datetime.now() - timedelta(days=range)
-    elif unit == TimeUnit.WEEKS:
-        start_date = datetime.now() - timedelta(weeks=range)
-    elif unit == TimeUnit.MONTHS:
-        start_date = datetime.now() - timedelta(days=30 * range)
-    elif unit == TimeUnit.YEARS:
-        start_date = datetime.now() - timedelta(days=365 * range)
-    elif unit == TimeUnit.ALL:
-        start_date = datetime.min
-    else:
-        raise HTTPException(status_code=400, detail="Invalid unit")
-
-    filtered_weight_history = [
-        AnimalWeightHistoryResponse(
-            id=wh.id, weight=wh.weight, change_date=wh.change_date
+    next_cursor = None
+    if len(weight_history) > limit:
+        weight_history = weight_history[:limit]
+        last = weight_history[-1]
+        next_cursor = encode_cursor(last.change_date, last.id)
+
+    page = AnimalWeightHistoryPageResponse(
+        items=[
+            AnimalWeightHistoryResponse(
+                id=wh.id, weight=wh.weight, change_date=wh.change_date
+            )
+            for wh in weight_history
+        ],
+        next_cursor=next_cursor,
+    )
+    entry = CachedResponse(etag, page.model_dump_json().encode())
+    await response_cache.set(key, entry)
+    return cached_response(request, entry)
+
+
+@router.get(
+    "/weight/{animal_id}/series",
+    response_model=AnimalWeightSeriesResponse,
+    status_code=200,
+)
+async def get_weight_series(
+    request: Request,
+    response: Response,
+    animal_id: str = Depends(deps.require_owned_animal),
+    bucket: TimeBucket = TimeBucket.DAY,
+    range: int = 1,
+    unit: TimeUnit = TimeUnit.MONTHS,
+    session: AsyncSession = Depends(deps.get_read_session),
+):
+    """Gets weight history downsampled to avg/min/max/count per day, week or
+    month, oldest bucket first. Only for logged users."""
+
+    # inlined so the same expression can be matched in GROUP BY
+    bucket_start = func.date_trunc(
+        literal(bucket.value, literal_execute=True), AnimalWeightHistory.change_date
+    )
+    start_date = get_start_date(range, unit)
+    window = and_(
+        AnimalWeightHistory.animal_id == animal_id,
+        AnimalWeightHistory.change_date >= start_date,
+    )
+    etag = make_etag(
+        "weight_series",
+        animal_id,
+        await collection_fingerprint(session, AnimalWeightHistory, window),
+        bucket.value,
+        range,
+        unit.value,
+    )
+    if cached := not_modified(request, etag):
+        return cached
+    response.headers["ETag"] = etag
+
+    result = await session.execute(
+        select(
+            bucket_start,
+            func.avg(AnimalWeightHistory.weight),
+            func.min(AnimalWeightHistory.weight),
+            func.max(AnimalWeightHistory.weight),
+            func.count(),
         )
-        for wh in weight_history
-        if wh.change_date >= start_date
+        .where(window)
+        .group_by(bucket_start)
+        .order_by(bucket_start)
+    )
+
+    return AnimalWeightSeriesResponse(
+        bucket=bucket.value,
+        items=[
+            AnimalWeightBucketResponse(
+                bucket_start=start, avg=average, min=low, max=high, count=count
+            )
+            for start, average, low, high, count in result.all()
+        ],
+    )
+
+
+# Declared before "/log/{animal_id}" so "bulk" is not taken for an animal id
+@router.post("/log/bulk", response_model=AnimalLogBulkResponse, status_code=200)
+async def add_log_bulk(
+    items: List[AnimalLogBulkItemRequest] = Body(
+        max_length=config.settings.BULK_INGEST_MAX_ITEMS
+    ),
+    session: AsyncSession = Depends(deps.get_session),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+):
+    """Adds logs to many animals at once. Items with an idempotency_key that was
+    already stored for the animal are not written again. Only for logged users."""
+    # Check ownership of all referenced animals with one query
+    animal_ids = {str(item.animal_id) for item in items}
+    result = await session.execute(
+        select(AnimalUserAssociation.animal_id)
+        .where(AnimalUserAssociation.user_id == current_user.id)
+        .where(AnimalUserAssociation.animal_id.in_(animal_ids))
+    )
+    owned_animal_ids = set(result.scalars().all())
+
+    responses = [
+        AnimalLogBulkItemResponse(index=index, status="animal_not_found")
+        for index in range(len(items))
     ]
+    rows = {}
+    for index, item in enumerate(items):
+        if str(item.animal_id) not in owned_animal_ids:
+            continue
+        rows[index] = {
+            "id": str(uuid.uuid4()),
+            "animal_id": str(item.animal_id),
+            "date": item.log.date.replace(tzinfo=None),
+            "activity": item.log.activity,
+            "comments": item.log.comments,
+            "idempotency_key": item.idempotency_key,
+        }
+
+    if rows:
+        result = await session.execute(
+            pg_insert(AnimalLog.__table__)
+            .on_conflict_do_nothing(index_elements=["animal_id", "idempotency_key"])
+            .returning(AnimalLog.__table__.c.id),
+            list(rows.values()),
+        )
+        created_ids = set(result.scalars().all())
+        await update_log_daily(
+            session,
+            [
+                (row["animal_id"], row["date"], row["activity"], 1)
+                for row in rows.values()
+                if row["id"] in created_ids
+            ],
+        )
+
+        # Rows skipped by ON CONFLICT were written by an earlier attempt
+        duplicate_keys = [
+            (row["animal_id"], row["idempotency_key"])
+            for row in rows.values()
+            if row["id"] not in created_ids
+        ]
+        existing_ids = {}
+        if duplicate_keys:
+            result = await session.execute(
+                select(
+                    AnimalLog.animal_id, AnimalLog.idempotency_key, AnimalLog.id
+                ).where(
+                    tuple_(AnimalLog.animal_id, AnimalLog.idempotency_key).in_(
+                        duplicate_keys
+                    )
+                )
+            )
+            existing_ids = {(animal_id, key): id for animal_id, key, id in result.all()}
+        for row in rows.values():
+            if row["id"] in created_ids:
+                publish(session, "log", row["animal_id"])
+        await session.commit()
+
+        for index, row in rows.items():
+            if row["id"] in created_ids:
+                responses[index] = AnimalLogBulkItemResponse(
+                    index=index, status="created", id=row["id"]
+                )
+            else:
+                responses[index] = AnimalLogBulkItemResponse(
+                    index=index,
+                    status="duplicate",
+                    id=existing_ids.get((row["animal_id"], row["idempotency_key"])),
+                )
+
+    return AnimalLogBulkResponse(
+        created=sum(response.status == "created" for response in responses),
+        items=responses,
+    )
 
-    return filtered_weight_history
 
-    
 @router.post("/log/{animal_id}", response_model=AnimalLogResponse, status_code=200)
 async def add_log(
-        animal_id: str,
         log_create: AnimalLogCreateRequest,
+        animal_id: str = Depends(deps.require_owned_animal),
         session: AsyncSession = Depends(deps.get_session),
-        current_user: User = Depends(deps.get_current_user),
     ):
     """Adds log to animal. Only for logged users."""
-    # Check if animal exists
-    result = await session.execute(
-        select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
-        .where(Animal.id == animal_id)
-    )
-    animal = result.scalars().first()
-    if animal is None:
-        raise HTTPException(status_code=404, detail="Animal not found")
-
     # Create AnimalLog
     animal_log = AnimalLog(
         animal_id=animal_id,
@@ -334,12 +646,47 @@ async def add_log(
     )
 
     session.add(animal_log)
+    await update_log_daily(
+        session, [(animal_id, animal_log.date, log_create.activity, 1)]
+    )
+    publish(session, "log", animal_id)
     await session.commit()
     await session.refresh(animal_log)
 
     return animal_log
-    
-    
+
+
+@router.post(
+    "/log/{animal_id}/async", response_model=AnimalLogAcceptedResponse, status_code=202
+)
+async def add_log_async(
+    log_create: AnimalLogCreateRequest,
+    animal_id: str = Depends(deps.require_owned_animal),
+):
+    """Accepts log to animal and writes it in the background in batches, for devices
+    posting frequent events. The log is readable once flushed, usually within
+    WRITE_BEHIND_FLUSH_INTERVAL_MS. Only for logged users."""
+    log_id = str(uuid.uuid4())
+    try:
+        write_behind.log_queue.submit(
+            {
+                "id": log_id,
+                "animal_id": animal_id,
+                "date": log_create.date.replace(tzinfo=None),
+                "activity": log_create.activity,
+                "comments": log_create.comments,
+            }
+        )
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Log queue is full, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+    return AnimalLogAcceptedResponse(id=log_id)
+
+
 # need the put, delete, and get for the animal logs, very similar to the weights above
 # ------------------
 
@@ -348,23 +695,29 @@ async def update_log(
         log_id: str,
         log_update: AnimalLogCreateRequest,
         session: AsyncSession = Depends(deps.get_session),
-        current_user: User = Depends(deps.get_current_user),
+        current_user: deps.Principal = Depends(deps.get_current_principal),
     ):
     """Updates log. Only for logged users."""
-    # Check if log exists
+    # Check if log exists and belongs to an owned animal
     result = await session.execute(
         select(AnimalLog)
         .where(AnimalLog.id == log_id)
+        .where(deps.owns_animal(current_user.id, AnimalLog.animal_id))
     )
     log = result.scalars().first()
     if log is None:
         raise HTTPException(status_code=404, detail="Log not found")
     # date: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
     # Update log
+    previous = (log.animal_id, log.date, log.activity, -1)
     log.date = log_update.date.replace(tzinfo=None)
     log.activity = log_update.activity.name
     log.comments = log_update.comments
 
+    await update_log_daily(
+        session, [previous, (log.animal_id, log.date, log.activity, 1)]
+    )
+    publish(session, "log", log.animal_id)
     await session.commit()
     await session.refresh(log)
 
@@ -372,80 +725,160 @@ async def update_log(
 
 
 
-@router.get("/log/{animal_id}", response_model=List[AnimalLogResponse], status_code=200)
+@router.get("/log/{animal_id}", response_model=AnimalLogPageResponse, status_code=200)
 async def get_log(
-        animal_id: str,
+        request: Request,
+        animal_id: str = Depends(deps.require_owned_animal),
         activity_types: List[ActivityTypes] = Query([], description="List of activity types to filter by"),
         range: int = 1,
         unit: TimeUnit = TimeUnit.DAYS,
-        session: AsyncSession = Depends(deps.get_session),
-        current_user: User = Depends(deps.get_current_user),
+        limit: int = Query(
+            config.settings.PAGINATION_DEFAULT_LIMIT,
+            ge=1,
+            le=config.settings.PAGINATION_MAX_LIMIT,
+        ),
+        cursor: Optional[str] = Query(None, description="next_cursor of previous page"),
+        session: AsyncSession = Depends(deps.get_read_session),
     ):
-    """Gets logs for an animal filtered by activity type. Only for logged users."""
-    # Check if animal exists
-    result = await session.execute(
-        select(Animal)
-        .options(subqueryload(Animal.owners))
-        .where(Animal.owners.any(id=current_user.id))
-        .where(Animal.id == animal_id)
+    """Gets logs for an animal filtered by activity type, newest first. Only for logged users."""
+    activity_names = []
+    if ActivityTypes.all not in activity_types and activity_types:
+        activity_names = sorted(activity_type.name for activity_type in activity_types)
+
+    key = await response_cache.key(
+        [log_tag(animal_id)],
+        "log",
+        animal_id,
+        activity_names,
+        range,
+        unit.value,
+        limit,
+        cursor,
     )
-    animal = result.scalars().first()
-    if animal is None:
-        raise HTTPException(status_code=404, detail="Animal not found")
+    # replicas may have refilled the entry with rows older than the user's write
+    if not session.info.get("read_your_writes") and (
+        entry := await response_cache.get(key)
+    ):
+        return cached_response(request, entry)
 
     # Calculate start date based on range and unit
-    if unit == TimeUnit.DAYS:
-        start_date = datetime.now() - timedelta(days=range)
-    elif unit == TimeUnit.WEEKS:
-        start_date = datetime.now() - timedelta(weeks=range)
-    elif unit == TimeUnit.MONTHS:
-        start_date = datetime.now() - timedelta(days=30 * range)
-    elif unit == TimeUnit.YEARS:
-        start_date = datetime.now() - timedelta(days=365 * range)
-    elif unit == TimeUnit.ALL:
-        start_date = datetime.min
-    else:
-        raise HTTPException(status_code=400, detail="Invalid unit")
+    start_date = get_start_date(range, unit)
 
     # Get logs filtered by activity type and date
-    if ActivityTypes.all in activity_types or not activity_types:
-        result = await session.execute(
-            select(AnimalLog)
-            .where(
-                and_(
-                    AnimalLog.animal_id == animal_id,
-                    AnimalLog.date >= start_date
-                )
+    fingerprint = await session.execute(
+        *queries.log_fingerprint(animal_id, start_date, activity_names)
+    )
+    etag = make_etag(
+        "log",
+        animal_id,
+        tuple(fingerprint.one()),
+        activity_names,
+        range,
+        unit.value,
+        limit,
+        cursor,
+    )
+    if cached := not_modified(request, etag):
+        return cached
+
+    result = await session.execute(
+        *queries.log_page(
+            animal_id,
+            start_date,
+            activity_names,
+            limit + 1,
+            decode_cursor(cursor) if cursor is not None else None,
+        )
+    )
+    logs = result.scalars().all()
+
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_cursor(logs[-1].date, logs[-1].id)
+
+    page = AnimalLogPageResponse(items=logs, next_cursor=next_cursor)
+    entry = CachedResponse(etag, page.model_dump_json().encode())
+    await response_cache.set(key, entry)
+    return cached_response(request, entry)
+
+
+@router.get(
+    "/log/{animal_id}/summary", response_model=AnimalLogSummaryResponse, status_code=200
+)
+async def get_log_summary(
+    animal_id: str = Depends(deps.require_owned_animal),
+    activity_types: List[ActivityTypes] = Query(
+        [], description="List of activity types to filter by"
+    ),
+    range: int = 1,
+    unit: TimeUnit = TimeUnit.YEARS,
+    session: AsyncSession = Depends(deps.get_read_session),
+):
+    """Gets per day activity counts of an animal from the daily rollup, oldest first. Only for logged users."""
+    start_date = get_start_date(range, unit)
+
+    query = (
+        select(AnimalLogDaily)
+        .where(
+            and_(
+                AnimalLogDaily.animal_id == animal_id,
+                AnimalLogDaily.day >= start_date.date(),
+                # days whose logs were all deleted or moved keep a zero row
+                AnimalLogDaily.count > 0,
             )
         )
-    else:
+        .order_by(AnimalLogDaily.day, AnimalLogDaily.activity)
+    )
+    if ActivityTypes.all not in activity_types and activity_types:
         activity_names = [activity_type.name for activity_type in activity_types]
-        result = await session.execute(
+        query = query.where(AnimalLogDaily.activity.in_(activity_names))
+
+    result = await session.execute(query)
+    return AnimalLogSummaryResponse(items=result.scalars().all())
+
+
+async def stream_log_export(animal_id: str):
+    """Yields all logs of the animal as NDJSON, one server-side cursor batch at a time"""
+    # own session, the request session may be closed before streaming ends
+    async with async_session() as session:
+        result = await session.stream_scalars(
             select(AnimalLog)
-            .where(
-                and_(
-                    AnimalLog.animal_id == animal_id,
-                    AnimalLog.activity.in_(activity_names),
-                    AnimalLog.date >= start_date
-                )
-            )
+            .where(AnimalLog.animal_id == animal_id)
+            .order_by(AnimalLog.date, AnimalLog.id)
+            .execution_options(yield_per=LOG_EXPORT_BATCH_SIZE)
         )
+        async for logs in result.partitions():
+            yield "".join(
+                AnimalLogExportResponse.model_validate(log).model_dump_json() + "\n"
+                for log in logs
+            )
+
+
+@router.get(
+    "/log/{animal_id}/export", response_class=StreamingResponse, status_code=200
+)
+async def export_log(
+    animal_id: str = Depends(deps.require_owned_animal),
+):
+    """Streams full log history of an animal as newline-delimited JSON, oldest first. Only for logged users."""
+    return StreamingResponse(
+        stream_log_export(animal_id), media_type="application/x-ndjson"
+    )
 
-    logs = result.scalars().all()
 
-    return logs
-    
 @router.delete("/log/{log_id}", response_model=AnimalLogResponse, status_code=200)
 async def delete_log(
         log_id: str,
         session: AsyncSession = Depends(deps.get_session),
-        current_user: User = Depends(deps.get_current_user),
+        current_user: deps.Principal = Depends(deps.get_current_principal),
     ):
     """Deletes log. Only for logged users."""
-    # Check if log exists
+    # Check if log exists and belongs to an owned animal
     result = await session.execute(
         select(AnimalLog)
         .where(AnimalLog.id == log_id)
+        .where(deps.owns_animal(current_user.id, AnimalLog.animal_id))
     )
     log = result.scalars().first()
     if log is None:
@@ -453,7 +886,8 @@ async def delete_log(
 
     # Delete log
     await session.delete(log)
+    await update_log_daily(session, [(log.animal_id, log.date, log.activity, -1)])
+    publish(session, "log", log.animal_id)
     await session.commit()
 
     return log
-    
@@ -8,7 +8,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.core import config, security
+from app.core import security
 from app.models import User
 from app.schemas.requests import RefreshTokenRequest
 from app.schemas.responses import AccessTokenResponse
@@ -29,7 +29,9 @@ async def login_access_token(
     if user is None:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
 
-    if not security.verify_password(form_data.password, user.hashed_password):
+    if not await security.async_verify_password(
+        form_data.password, user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
 
     return security.generate_access_token_response(str(user.id))
@@ -42,20 +44,13 @@ async def refresh_token(
 ):
     """OAuth2 compatible token, get an access token for future requests using refresh token"""
     try:
-        payload = jwt.decode(
-            input.refresh_token,
-            config.settings.SECRET_KEY,
-            algorithms=[security.JWT_ALGORITHM],
-        )
+        token_data = security.decode_jwt_token(input.refresh_token)
     except (jwt.DecodeError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials, unknown error",
         )
 
-    # JWT guarantees payload will be unchanged (and thus valid), no errors here
-    token_data = security.JWTTokenPayload(**payload)
-
     if not token_data.refresh:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+
+from app.api import deps
+from app.core import config
+from app.core.session import POOL_CHECKOUT_SECONDS, POOL_TIMEOUTS, async_engine
+from app.models import User
+from app.schemas.responses import HistogramBucketResponse, PoolStatusResponse
+
+router = APIRouter()
+
+
+@router.get("/pool", response_model=PoolStatusResponse)
+async def get_pool_status(
+    current_user: User = Depends(deps.get_current_superuser),
+):
+    """Connection pool usage of the worker serving the request. Only for superuser."""
+    pool = async_engine.pool
+    return PoolStatusResponse(
+        size=pool.size(),
+        max_overflow=config.settings.DATABASE_MAX_OVERFLOW,
+        timeout=pool.timeout(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+        checkout_count=POOL_CHECKOUT_SECONDS.count,
+        checkout_seconds_sum=POOL_CHECKOUT_SECONDS.sum,
+        checkout_seconds_buckets=[
+            HistogramBucketResponse(le=bound, count=count)
+            for bound, count in POOL_CHECKOUT_SECONDS.cumulative_counts()[:-1]
+        ],
+        timeouts=int(POOL_TIMEOUTS.value),
+    )
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.core.security import get_password_hash
+from app.api.endpoints.utils import make_etag, not_modified
+from app.core.invalidation import publish
+from app.core.security import async_get_password_hash
 from app.models import User
 from app.schemas.requests import (
     UserCreateRequest,
@@ -11,9 +13,8 @@ from app.schemas.requests import (
     UserUpdateRequest,
 )
 from app.schemas.responses import UserResponse
-from app.utils.services import update_record
+from app.utils.services import publish_co_owners, update_record
 from sqlalchemy.orm import joinedload
-from app.models import AnimalUserAssociation
 
 
 router = APIRouter()
@@ -21,9 +22,15 @@ router = APIRouter()
 
 @router.get("/me", response_model=UserResponse)
 async def read_current_user(
+    request: Request,
+    response: Response,
     current_user: User = Depends(deps.get_current_user),
 ):
     """Get current user"""
+    etag = make_etag(current_user.id, current_user.version)
+    if cached := not_modified(request, etag):
+        return cached
+    response.headers["ETag"] = etag
     return current_user
 
 
@@ -44,23 +51,12 @@ async def delete_current_user(
     session: AsyncSession = Depends(deps.get_session),
 ):
     """Delete current user"""
-    # Fetch the associations for the current user
-    result = await session.execute(
-        select(AnimalUserAssociation).where(
-            AnimalUserAssociation.user_id == current_user.id
-        )
-    )
-    associations = result.scalars().all()
-
-    # Delete the associations
-    for association in associations:
-        await session.delete(association)
-
-    # Commit the changes to the database
-    await session.commit()
-
-    # Delete the user
+    # co-owners stop listing the user among the owners of shared animals
+    await publish_co_owners(session, current_user.id)
+    # animal associations go with the user, ON DELETE CASCADE
     await session.execute(delete(User).where(User.id == current_user.id))
+    publish(session, "ownership", current_user.id)
+    publish(session, "user", current_user.id)
     await session.commit()
 
 
@@ -71,7 +67,9 @@ async def reset_current_user_password(
     current_user: User = Depends(deps.get_current_user),
 ):
     """Update current user password"""
-    new_values = {"hashed_password": get_password_hash(user_update_password.password)}
+    new_values = {
+        "hashed_password": await async_get_password_hash(user_update_password.password)
+    }
     await update_record(session, current_user, new_values)
     return current_user
 
@@ -87,7 +85,7 @@ async def register_new_user(
         raise HTTPException(status_code=400, detail="Cannot use this email address")
     user = User(
         email=new_user.email,
-        hashed_password=get_password_hash(new_user.password),
+        hashed_password=await async_get_password_hash(new_user.password),
     )
     session.add(user)
     await session.commit()
@@ -101,10 +99,6 @@ async def update_user(
     session: AsyncSession = Depends(deps.get_session),
 ):
     """Update user"""
-    result = await session.execute(select(User).where(User.id == current_user.id))
-    user = result.scalars().first()
-    if user is None:
-        raise HTTPException(status_code=400, detail="User does not exist")
     new_values = user_update.model_dump(exclude_unset=True)
-    await update_record(session, user, new_values)
-    return user
+    await update_record(session, current_user, new_values)
+    return current_user
@@ -1,8 +1,113 @@
+import base64
+import binascii
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
 from enum import Enum
+from typing import Any
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.response_cache import CachedResponse
+
 
 class TimeUnit(Enum):
     DAYS = "days"
     WEEKS = "weeks"
     MONTHS = "months"
     YEARS = "years"
-    ALL = "all"
\ No newline at end of file
+    ALL = "all"
+
+
+class TimeBucket(Enum):
+    """Granularity accepted by postgres `date_trunc`"""
+
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+def get_start_date(range: int, unit: TimeUnit) -> datetime:
+    """Returns the beginning of the time window ending now"""
+    if unit == TimeUnit.DAYS:
+        return datetime.now() - timedelta(days=range)
+    elif unit == TimeUnit.WEEKS:
+        return datetime.now() - timedelta(weeks=range)
+    elif unit == TimeUnit.MONTHS:
+        return datetime.now() - timedelta(days=30 * range)
+    elif unit == TimeUnit.YEARS:
+        return datetime.now() - timedelta(days=365 * range)
+    elif unit == TimeUnit.ALL:
+        return datetime.min
+    raise HTTPException(status_code=400, detail="Invalid unit")
+
+
+# ------------------
+# Keyset pagination
+# ------------------
+
+
+def encode_cursor(position: datetime, id: str) -> str:
+    """Opaque cursor pointing at the last returned (datetime, id) row"""
+    raw = json.dumps([position.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        position, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(id, str):
+            raise TypeError(id)
+        position = datetime.fromisoformat(position)
+        # positions are naive like the timestamp columns they are compared to
+        if position.tzinfo is not None:
+            raise ValueError(position)
+        return position, str(uuid.UUID(id))
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# ------------------
+# Conditional requests
+# ------------------
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from json-serializable parts, e.g. `(id, version)`"""
+    raw = json.dumps(parts, default=str, separators=(",", ":")).encode()
+    return f'"{hashlib.sha256(raw).hexdigest()[:32]}"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """Returns 304 response if `If-None-Match` matches `etag`, None otherwise"""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # If-None-Match uses weak comparison, W/ prefix is ignored
+    if "*" in candidates or etag in [c.removeprefix("W/") for c in candidates]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def cached_response(request: Request, entry: CachedResponse) -> Response:
+    """Serves a response cache entry, honouring `If-None-Match`"""
+    return not_modified(request, entry.etag) or Response(
+        entry.body, media_type="application/json", headers={"ETag": entry.etag}
+    )
+
+
+async def collection_fingerprint(
+    session: AsyncSession, model: Any, *criteria: Any
+) -> tuple:
+    """Aggregates that change whenever a matching row is added, removed or
+    updated, answered without loading the rows"""
+    result = await session.execute(
+        select(func.count(), func.max(model.updated_at), func.sum(model.version))
+        .select_from(model)
+        .where(*criteria)
+    )
+    return tuple(result.one())
@@ -0,0 +1,40 @@
+"""
+Rebuilds the `animal_log_daily` rollup from `animal_log`.
+
+Run once after the `add_animal_log_daily` migration, or whenever the rollup is
+suspected to be out of sync:
+
+python -m app.backfill_log_daily
+"""
+
+import asyncio
+
+from sqlalchemy import Date, cast, delete, func, insert, select, text
+
+from app.core.session import async_session
+from app.models import AnimalLog, AnimalLogDaily
+
+
+async def main() -> None:
+    print("Start animal_log_daily backfill")
+    async with async_session() as session:
+        # waits for in-flight log writes and blocks new ones until commit, so
+        # no increment is lost or counted twice
+        await session.execute(text("LOCK TABLE animal_log_daily IN EXCLUSIVE MODE"))
+        await session.execute(delete(AnimalLogDaily))
+
+        day = cast(AnimalLog.date, Date)
+        result = await session.execute(
+            insert(AnimalLogDaily).from_select(
+                ["animal_id", "day", "activity", "count"],
+                select(
+                    AnimalLog.animal_id, day, AnimalLog.activity, func.count()
+                ).group_by(AnimalLog.animal_id, day, AnimalLog.activity),
+            )
+        )
+        await session.commit()
+        print(f"animal_log_daily rebuilt with {result.rowcount} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
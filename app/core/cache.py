@@ -0,0 +1,139 @@
+"""
+Per-worker in-memory caches.
+
+`TTLCache` is a bounded LRU mapping whose entries also expire after a time to live.
+It is meant to be used from the event loop only, every uvicorn worker keeps its own
+instances, so anything cached here must be invalidated explicitly on writes.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from app.core import config, metrics
+
+
+class TTLCache:
+    """Bounded LRU cache with per entry expiry and hit/miss counters."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = metrics.counter(
+            f"{name}_cache_hits_total", f"Lookups served from the {name} cache"
+        )
+        self.misses = metrics.counter(
+            f"{name}_cache_misses_total", f"Lookups missing the {name} cache"
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits.value + self.misses.value
+        return self.hits.value / lookups if lookups else 0.0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Returns cached value or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses.inc()
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses.inc()
+            return None
+        self._data.move_to_end(key)
+        self.hits.inc()
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Stores value, evicting the least recently used entry when full."""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drops every entry whose key matches, scans the whole cache."""
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# Detached `User` snapshots keyed by user id, see `deps.get_current_user`
+user_cache = TTLCache(
+    "user",
+    maxsize=config.settings.USER_CACHE_MAX_SIZE,
+    ttl=config.settings.USER_CACHE_TTL_SECONDS,
+)
+
+# `User.active` flags keyed by user id, see `deps.get_current_principal`
+user_active_cache = TTLCache(
+    "user_active",
+    maxsize=config.settings.USER_CACHE_MAX_SIZE,
+    ttl=config.settings.PRINCIPAL_REVOCATION_TTL_SECONDS,
+)
+
+# Verified `JWTTokenPayload` keyed by sha256 of the token, entries live until the
+# token expires, see `security.decode_jwt_token`
+token_cache = TTLCache(
+    "token",
+    maxsize=config.settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=config.settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+# `True` for (user_id, animal_id) pairs known to be owned, see
+# `deps.require_owned_animal`. Only positive results are kept, so a stale entry
+# can only grant access to an animal that was unlinked, hence the "ownership" and
+# "animal" invalidation events wherever associations are deleted.
+ownership_cache = TTLCache(
+    "ownership",
+    maxsize=config.settings.OWNERSHIP_CACHE_MAX_SIZE,
+    ttl=config.settings.OWNERSHIP_CACHE_TTL_SECONDS,
+)
+metrics.gauge(
+    "ownership_cache_hit_ratio",
+    "Share of ownership checks served from the ownership cache",
+    function=lambda: ownership_cache.hit_ratio,
+)
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drops everything cached about the user in this worker."""
+    user_cache.invalidate(user_id)
+    user_active_cache.invalidate(user_id)
+
+
+def invalidate_ownership(
+    user_id: str | None = None, animal_id: str | None = None
+) -> None:
+    """Drops cached ownership of the pair, or of every pair of the user or animal."""
+    if user_id is not None and animal_id is not None:
+        ownership_cache.invalidate((user_id, animal_id))
+    elif user_id is not None:
+        ownership_cache.invalidate_where(lambda key: key[0] == user_id)
+    elif animal_id is not None:
+        ownership_cache.invalidate_where(lambda key: key[1] == animal_id)
+
+
+# `True` for users who wrote within READ_YOUR_WRITES_SECONDS, their reads skip the
+# replicas, see `deps.get_read_session`. Set by the "writer" invalidation event.
+recent_writers = TTLCache(
+    "recent_writer",
+    maxsize=config.settings.USER_CACHE_MAX_SIZE,
+    ttl=config.settings.READ_YOUR_WRITES_SECONDS,
+)
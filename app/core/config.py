@@ -39,16 +39,65 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ENVIRONMENT: Literal["DEV", "PYTEST", "STG", "PRD"] = "DEV"
     SECURITY_BCRYPT_ROUNDS: int = 12
+    SECURITY_HASHING_MAX_WORKERS: int = 2
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 11520  # 8 days
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 40320  # 28 days
     BACKEND_CORS_ORIGINS: list[AnyHttpUrl] = []
     ALLOWED_HOSTS: list[str] = ["localhost", "127.0.0.1"]
 
+    # PAGINATION
+    PAGINATION_DEFAULT_LIMIT: int = 100
+    PAGINATION_MAX_LIMIT: int = 1000
+
+    # BULK INGESTION
+    BULK_INGEST_MAX_ITEMS: int = 5000
+
+    # WRITE-BEHIND LOG INGESTION, see `app/core/write_behind.py`
+    WRITE_BEHIND_MAX_QUEUE_SIZE: int = 10000
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_FLUSH_INTERVAL_MS: int = 200
+    WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS: int = 30
+
+    # PER WORKER CACHES
+    USER_CACHE_MAX_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 60
+    # deactivated users keep access to claims-only endpoints at most this long
+    PRINCIPAL_REVOCATION_TTL_SECONDS: int = 30
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    # positive (user_id, animal_id) ownership checks
+    OWNERSHIP_CACHE_MAX_SIZE: int = 10000
+    OWNERSHIP_CACHE_TTL_SECONDS: int = 30
+    # serialized GET responses, see `app/core/response_cache.py`
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    RESPONSE_CACHE_TTL_SECONDS: int = 30
+    # pause between LISTEN reconnect attempts, see `app/core/invalidation.py`
+    INVALIDATION_LISTENER_RETRY_SECONDS: float = 1.0
+
     # PROJECT NAME, VERSION AND DESCRIPTION
     PROJECT_NAME: str = PYPROJECT_CONTENT["name"]
     VERSION: str = PYPROJECT_CONTENT["version"]
     DESCRIPTION: str = PYPROJECT_CONTENT["description"]
 
+    # DATABASE CONNECTION POOL, per worker, see `app/core/session.py`
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 30
+    # -1 keeps connections forever
+    DATABASE_POOL_RECYCLE_SECONDS: int = -1
+    DATABASE_POOL_PRE_PING: bool = True
+    # prepared statements cached per connection, 0 when behind pgbouncer in
+    # transaction pooling mode
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    # compiled SQL strings cached per engine, see `app/queries.py`
+    DATABASE_COMPILED_CACHE_SIZE: int = 500
+
+    # READ REPLICAS, full postgresql+asyncpg URIs, see `deps.get_read_session`
+    DATABASE_REPLICA_URIS: list[str] = []
+    # replica that failed to connect is skipped this long
+    DATABASE_REPLICA_RETRY_SECONDS: float = 30
+    # reads of a user stay on primary this long after their own write
+    READ_YOUR_WRITES_SECONDS: float = 5
+
     # POSTGRESQL DEFAULT DATABASE
     DEFAULT_DATABASE_HOSTNAME: str
     DEFAULT_DATABASE_USER: str
@@ -0,0 +1,282 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Writers call `publish(session, entity, id, version)` before committing. On
+commit the events are sent with `pg_notify` inside the same transaction, so
+other workers only hear about committed changes, and are applied to this
+worker's caches right after the commit returns. Every worker runs a
+`InvalidationListener` from the app lifespan which applies events published by
+the other workers, on its own connection outside the engine pool. Notifications
+sent while a listener is disconnected are lost, so it drops all local caches
+whenever it (re)connects.
+
+Entities and the caches they evict are listed in `HANDLERS`. Sessions tagged
+with `session.info["user_id"]` (see `deps.get_current_principal`) publish a
+"writer" event whenever they write, which pins that user's reads to the primary
+for READ_YOUR_WRITES_SECONDS in every worker, see `deps.get_read_session`.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import asyncpg
+from sqlalchemy import event, text
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+from sqlalchemy.util import await_only
+
+from app.core import config, metrics
+from app.core.cache import (
+    invalidate_ownership,
+    invalidate_user,
+    ownership_cache,
+    recent_writers,
+    token_cache,
+    user_active_cache,
+    user_cache,
+)
+from app.core.response_cache import animals_tag, log_tag, response_cache, weight_tag
+from app.core.session import async_engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+# tells this worker's own notifications apart, they are applied on commit already
+ORIGIN = uuid.uuid4().hex
+
+EVENTS_PUBLISHED = metrics.counter(
+    "invalidation_events_published_total", "Cache invalidations sent with NOTIFY"
+)
+EVENTS_RECEIVED = metrics.counter(
+    "invalidation_events_received_total",
+    "Cache invalidations received from other workers",
+)
+LAG_SECONDS = metrics.histogram(
+    "invalidation_lag_seconds",
+    "Time from commit in another worker to local eviction",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+RECONNECTS = metrics.counter(
+    "invalidation_listener_reconnects_total", "LISTEN connections re-established"
+)
+LISTENER_CONNECTED = metrics.gauge(
+    "invalidation_listener_connected", "1 while the LISTEN connection is up"
+)
+
+
+async def _user(id: str) -> None:
+    invalidate_user(id)
+
+
+async def _ownership(id: str) -> None:
+    invalidate_ownership(user_id=id)
+
+
+async def _user_animals(id: str) -> None:
+    await response_cache.invalidate(animals_tag(id))
+
+
+async def _animal(id: str) -> None:
+    invalidate_ownership(animal_id=id)
+    await response_cache.invalidate(weight_tag(id), log_tag(id))
+
+
+async def _weight(id: str) -> None:
+    await response_cache.invalidate(weight_tag(id))
+
+
+async def _log(id: str) -> None:
+    await response_cache.invalidate(log_tag(id))
+
+
+async def _writer(id: str) -> None:
+    recent_writers.set(id, True)
+
+
+HANDLERS: dict[str, Callable[[str], Awaitable[None]]] = {
+    # User row, id is user id
+    "user": _user,
+    # animals unlinked from user, id is user id
+    "ownership": _ownership,
+    # GET /animals/all of user changed, id is user id
+    "user_animals": _user_animals,
+    # animal deleted, id is animal id
+    "animal": _animal,
+    # weight history of animal changed, id is animal id
+    "weight": _weight,
+    # logs of animal changed, id is animal id
+    "log": _log,
+    # user committed a write, id is user id
+    "writer": _writer,
+}
+
+
+def publish(session, entity: str, id: str, version: int | None = None) -> None:
+    """Schedules invalidation of `entity` for when `session` commits.
+
+    `session` is an `AsyncSession` or `Session`, nothing is sent on rollback.
+    """
+    if entity not in HANDLERS:
+        raise ValueError(f"Unknown invalidation entity {entity}")
+    events = session.info.setdefault("invalidations", {})
+    events[(entity, str(id))] = version
+
+
+async def apply(entity: str, id: str) -> None:
+    handler = HANDLERS.get(entity)
+    if handler is not None:
+        await handler(id)
+
+
+async def clear_local_caches() -> None:
+    user_cache.clear()
+    user_active_cache.clear()
+    token_cache.clear()
+    ownership_cache.clear()
+    await response_cache.clear()
+
+
+def _mark_writer(session: Session) -> None:
+    user_id = session.info.get("user_id")
+    if user_id is not None:
+        publish(session, "writer", user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_writer_flush(session: Session, flush_context: UOWTransaction) -> None:
+    _mark_writer(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_writer_execute(orm_execute_state: ORMExecuteState) -> None:
+    # Core INSERT / UPDATE / DELETE passed to session.execute skip the flush
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        _mark_writer(orm_execute_state.session)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify(session: Session) -> None:
+    # commit flushes pending ORM changes only after this hook, flush first so the
+    # "writer" event of `_mark_writer_flush` is sent too
+    session.flush()
+    events = session.info.get("invalidations")
+    if not events:
+        return
+    sent_at = time.time()
+    payloads = [
+        json.dumps({"e": entity, "id": id, "v": version, "t": sent_at, "o": ORIGIN})
+        for (entity, id), version in events.items()
+    ]
+    # one round trip however many events the transaction published
+    session.execute(
+        text(
+            "SELECT pg_notify(:channel, payload) "
+            "FROM unnest(CAST(:payloads AS text[])) AS payload"
+        ),
+        {"channel": CHANNEL, "payloads": payloads},
+    )
+    EVENTS_PUBLISHED.inc(len(events))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session) -> None:
+    events = session.info.pop("invalidations", None)
+    if not events:
+        return
+    # runs inside AsyncSession.commit, so the async handlers can be awaited
+    for entity, id in events:
+        await_only(apply(entity, id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop("invalidations", None)
+
+
+class InvalidationListener:
+    """Background task applying other workers' invalidations."""
+
+    # queued by asyncpg when the LISTEN connection dies
+    _LOST = object()
+
+    def __init__(self, retry_interval: float) -> None:
+        self.retry_interval = retry_interval
+        self._task: asyncio.Task | None = None
+        self._events: asyncio.Queue[Any] = asyncio.Queue()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        reconnect = False
+        while True:
+            try:
+                connection = await self._connect()
+                try:
+                    await self._listen(connection, reconnect)
+                finally:
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Invalidation listener disconnected")
+            finally:
+                LISTENER_CONNECTED.set(0)
+            reconnect = True
+            await asyncio.sleep(self.retry_interval)
+
+    async def _connect(self) -> asyncpg.Connection:
+        # a dedicated connection, LISTEN would hold a pooled one for good
+        dsn = async_engine.url.set(drivername="postgresql")
+        return await asyncpg.connect(dsn.render_as_string(hide_password=False))
+
+    async def _listen(self, driver_connection, reconnect: bool) -> None:
+        events = self._events = asyncio.Queue()
+        driver_connection.add_termination_listener(
+            lambda connection: events.put_nowait(self._LOST)
+        )
+        await driver_connection.add_listener(CHANNEL, self._on_notification)
+        # anything published while disconnected was missed
+        await clear_local_caches()
+        if reconnect:
+            RECONNECTS.inc()
+        LISTENER_CONNECTED.set(1)
+
+        while (data := await self._events.get()) is not self._LOST:
+            await apply(data["e"], data["id"])
+            LAG_SECONDS.observe(max(time.time() - data["t"], 0.0))
+            EVENTS_RECEIVED.inc()
+        raise ConnectionError("LISTEN connection lost")
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning("Malformed invalidation %r", payload)
+            return
+        if data.get("o") != ORIGIN:
+            self._events.put_nowait(data)
+
+
+listener = InvalidationListener(
+    retry_interval=config.settings.INVALIDATION_LISTENER_RETRY_SECONDS
+)
@@ -0,0 +1,256 @@
+"""
+Minimal in-process metrics: counters, gauges and histograms.
+
+Values live in the memory of a single uvicorn worker, every worker keeps its own.
+Metrics are registered once at import time with `counter`, `gauge` or `histogram`
+and are safe to update from both the event loop and worker threads. Metrics
+with labels are registered with `counter_family` or `histogram_family` and
+updated through `family.labels(*values)`. `render` formats the registry in the
+Prometheus text exposition format, served on `/metrics`.
+"""
+
+import bisect
+import threading
+from collections.abc import Callable, Iterator, Sequence
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """Value that can go up and down, or be computed on read with `function`."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        function: Callable[[], float] | None = None,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self._function = function
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._value
+
+
+class Histogram:
+    """Distribution of observed values over fixed upper-bound buckets."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """Returns `(upper_bound, count)` pairs, the last bound is `inf`."""
+        with self._lock:
+            counts = list(self._counts)
+        result, total = [], 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Family:
+    """Metric with labels, one child `Counter` or `Histogram` per combination of
+    label values. Keep label values bounded, e.g. route templates, not paths."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str],
+        factory: Callable[[], Counter | Histogram],
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.kind = type(factory())
+        self._factory = factory
+        self._children: dict[tuple[str, ...], Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Counter | Histogram:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def children(self) -> list[tuple[tuple[str, ...], Counter | Histogram]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+Metric = Counter | Gauge | Histogram | Family
+
+REGISTRY: dict[str, Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric: Metric) -> Metric:
+    with _registry_lock:
+        existing = REGISTRY.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} already registered")
+            return existing
+        REGISTRY[metric.name] = metric
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    return _register(Counter(name, description))  # type: ignore
+
+
+def gauge(
+    name: str, description: str, function: Callable[[], float] | None = None
+) -> Gauge:
+    return _register(Gauge(name, description, function))  # type: ignore
+
+
+def histogram(
+    name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return _register(Histogram(name, description, buckets))  # type: ignore
+
+
+def counter_family(name: str, description: str, labelnames: Sequence[str]) -> Family:
+    return _register(  # type: ignore
+        Family(name, description, labelnames, lambda: Counter(name, description))
+    )
+
+
+def histogram_family(
+    name: str,
+    description: str,
+    labelnames: Sequence[str],
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Family:
+    return _register(  # type: ignore
+        Family(
+            name,
+            description,
+            labelnames,
+            lambda: Histogram(name, description, buckets),
+        )
+    )
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _samples(
+    name: str, metric: Counter | Gauge | Histogram, labelnames, labelvalues
+) -> Iterator[str]:
+    if isinstance(metric, Histogram):
+        for bound, count in metric.cumulative_counts():
+            labels = _format_labels(
+                (*labelnames, "le"), (*labelvalues, _format_value(bound))
+            )
+            yield f"{name}_bucket{labels} {count}"
+        labels = _format_labels(labelnames, labelvalues)
+        yield f"{name}_sum{labels} {_format_value(metric.sum)}"
+        yield f"{name}_count{labels} {metric.count}"
+    else:
+        labels = _format_labels(labelnames, labelvalues)
+        yield f"{name}{labels} {_format_value(metric.value)}"
+
+
+_KINDS = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}
+
+
+def render(registry: dict[str, Metric] | None = None) -> str:
+    """Formats every registered metric in the Prometheus text format 0.0.4."""
+    if registry is None:
+        registry = REGISTRY
+    with _registry_lock:
+        metrics = sorted(registry.values(), key=lambda metric: metric.name)
+
+    lines = []
+    for metric in metrics:
+        kind = metric.kind if isinstance(metric, Family) else type(metric)
+        description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {description}")
+        lines.append(f"# TYPE {metric.name} {_KINDS[kind]}")
+        if isinstance(metric, Family):
+            for values, child in sorted(metric.children(), key=lambda c: c[0]):
+                lines.extend(_samples(metric.name, child, metric.labelnames, values))
+        else:
+            lines.extend(_samples(metric.name, metric, (), ()))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+"""
+Per-route request metrics: latency, response size and the database work done
+on behalf of each request.
+
+`MetricsMiddleware` keeps a `RequestStats` in a context variable for the
+duration of a request. Cursor execution hooks installed on every engine by
+`instrument_engine`, and the pool checkout timing in `app/core/session.py`, add
+to it. SQLAlchemy runs them in a greenlet sharing the request task's context.
+Routes are labelled by their path template, requests matching no route share
+the "unmatched" label.
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+LABELS = ("method", "route")
+
+REQUESTS = metrics.counter_family(
+    "http_requests_total", "HTTP requests served", (*LABELS, "status")
+)
+REQUEST_SECONDS = metrics.histogram_family(
+    "http_request_duration_seconds", "Time to serve a request", LABELS
+)
+RESPONSE_BYTES = metrics.histogram_family(
+    "http_response_size_bytes",
+    "Size of response bodies",
+    LABELS,
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+DB_STATEMENTS = metrics.histogram_family(
+    "http_request_db_statements",
+    "SQL statements executed per request",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_SECONDS = metrics.histogram_family(
+    "http_request_db_seconds", "Time spent executing SQL per request", LABELS
+)
+POOL_WAIT_SECONDS = metrics.histogram_family(
+    "http_request_pool_wait_seconds",
+    "Time spent waiting for pooled connections per request",
+    LABELS,
+)
+
+
+@dataclass(slots=True)
+class RequestStats:
+    db_statements: int = 0
+    db_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current() -> RequestStats | None:
+    """Stats of the request being served, None outside of requests."""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started_at"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = conn.info.pop("query_started_at", None)
+    stats = _current.get()
+    if stats is None or started_at is None:
+        return
+    stats.db_statements += 1
+    stats.db_seconds += time.perf_counter() - started_at
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def add_pool_wait(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, does not buffer or wrap streaming responses."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        size = 0
+
+        async def send_with_stats(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            _current.reset(token)
+            # set by the router on the shared scope once a route matched
+            route = getattr(scope.get("route"), "path", "unmatched")
+            labels = (scope["method"], route)
+            REQUESTS.labels(*labels, str(status)).inc()
+            REQUEST_SECONDS.labels(*labels).observe(elapsed)
+            RESPONSE_BYTES.labels(*labels).observe(size)
+            DB_STATEMENTS.labels(*labels).observe(stats.db_statements)
+            DB_SECONDS.labels(*labels).observe(stats.db_seconds)
+            POOL_WAIT_SECONDS.labels(*labels).observe(stats.pool_wait_seconds)
@@ -0,0 +1,178 @@
+"""
+Cache of serialized GET responses with tag based invalidation.
+
+Entries are keyed by the request parameters plus the current generation of every
+tag the response depends on, e.g. `weight_tag(animal_id)`. Writes call
+`response_cache.invalidate(tag)` after commit which bumps the generation, so
+later reads build new keys and the stale entries age out of the LRU. Keys are
+built before the database is read, a response computed concurrently with a write
+is stored under the old generation and never served again.
+
+Storage is delegated to a `ResponseCacheBackend`. `MemoryBackend` keeps entries
+and generations in the memory of a single worker, writes in other workers reach
+it through the LISTEN/NOTIFY events of `app/core/invalidation.py`, which
+invalidate the same tags here shortly after their commit. A shared store
+implementing the same protocol would not need the broadcast.
+"""
+
+import hashlib
+import itertools
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from app.core import config, metrics
+
+
+@dataclass(slots=True, frozen=True)
+class CachedResponse:
+    etag: str
+    body: bytes
+
+
+class ResponseCacheBackend(Protocol):
+    async def get(self, key: str) -> CachedResponse | None:
+        ...
+
+    async def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        ...
+
+    async def generation(self, tag: str) -> int:
+        ...
+
+    async def bump(self, tag: str) -> None:
+        ...
+
+    async def clear(self) -> None:
+        ...
+
+
+class MemoryBackend:
+    """Per worker LRU bounded by the total size of stored bodies.
+
+    Generations are forgotten `generation_ttl` seconds after their last bump, a
+    forgotten tag is back at generation 0. Keep it above the entry ttl plus the
+    longest cached request, entries stored under the old generation 0 have then
+    expired and cannot be served again.
+    """
+
+    def __init__(self, max_bytes: int, generation_ttl: float = 3600) -> None:
+        self.max_bytes = max_bytes
+        self.generation_ttl = generation_ttl
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+        # tag -> (generation, expires_at), oldest bump first
+        self._generations: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._counter = itertools.count(1)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        if len(value.body) > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.size += len(value.body)
+        while self.size > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    async def generation(self, tag: str) -> int:
+        generation, expires_at = self._generations.get(tag, (0, 0.0))
+        return generation if expires_at > time.monotonic() else 0
+
+    async def bump(self, tag: str) -> None:
+        now = time.monotonic()
+        self._generations.pop(tag, None)
+        self._generations[tag] = (next(self._counter), now + self.generation_ttl)
+        # bounded by the tags bumped within the last generation_ttl
+        while self._generations:
+            _, expires_at = next(iter(self._generations.values()))
+            if expires_at > now:
+                break
+            self._generations.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+        self.size = 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1].body)
+
+
+class ResponseCache:
+    def __init__(self, backend: ResponseCacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = metrics.counter(
+            "response_cache_hits_total", "GET responses served from the cache"
+        )
+        self.misses = metrics.counter(
+            "response_cache_misses_total", "GET responses missing the cache"
+        )
+
+    async def key(self, tags: Sequence[str], *parts: Any) -> str:
+        """Cache key of a response depending on `tags`, `parts` are the
+        request parameters"""
+        generations = [await self.backend.generation(tag) for tag in tags]
+        raw = json.dumps([list(tags), generations, parts], default=str).encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    async def get(self, key: str) -> CachedResponse | None:
+        value = await self.backend.get(key)
+        (self.misses if value is None else self.hits).inc()
+        return value
+
+    async def set(self, key: str, value: CachedResponse) -> None:
+        await self.backend.set(key, value, self.ttl)
+
+    async def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            await self.backend.bump(tag)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+
+def animals_tag(user_id: str) -> str:
+    """Animals listed for the user, `GET /animals/all`"""
+    return f"animals:{user_id}"
+
+
+def weight_tag(animal_id: str) -> str:
+    """Weight history reads of the animal"""
+    return f"weight:{animal_id}"
+
+
+def log_tag(animal_id: str) -> str:
+    """Log reads of the animal"""
+    return f"log:{animal_id}"
+
+
+response_cache = ResponseCache(
+    MemoryBackend(
+        config.settings.RESPONSE_CACHE_MAX_BYTES,
+        # cached requests take a fraction of the entry ttl
+        generation_ttl=2 * config.settings.RESPONSE_CACHE_TTL_SECONDS,
+    ),
+    ttl=config.settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+metrics.gauge(
+    "response_cache_bytes",
+    "Size of response bodies held by the in-process response cache",
+    function=lambda: getattr(response_cache.backend, "size", 0),
+)
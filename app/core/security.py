@@ -1,12 +1,17 @@
 """Black-box security shortcuts to generate JWT tokens and password hashing and verifcation."""
 
+import asyncio
+import hashlib
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
-from app.core import config
+from app.core import config, metrics
+from app.core.cache import token_cache
 from app.schemas.responses import AccessTokenResponse
 
 JWT_ALGORITHM = "HS256"
@@ -18,6 +23,21 @@ PWD_CONTEXT = CryptContext(
     bcrypt__rounds=config.settings.SECURITY_BCRYPT_ROUNDS,
 )
 
+# bcrypt releases the GIL while hashing, so a thread pool is enough to keep
+# the event loop free, max_workers caps how many hashes run at the same time
+HASHING_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.settings.SECURITY_HASHING_MAX_WORKERS,
+    thread_name_prefix="password-hashing",
+)
+HASHING_QUEUE_DEPTH = metrics.gauge(
+    "password_hashing_queue_depth",
+    "Password hashing jobs waiting for a free worker",
+)
+HASHING_WAIT_SECONDS = metrics.histogram(
+    "password_hashing_wait_seconds",
+    "Time password hashing jobs spent waiting for a free worker",
+)
+
 
 class JWTTokenPayload(BaseModel):
     sub: str | int
@@ -52,6 +72,28 @@ def create_jwt_token(subject: str | int, exp_secs: int, refresh: bool):
     return encoded_jwt, expires_at, issued_at
 
 
+def decode_jwt_token(token: str) -> JWTTokenPayload:
+    """Verifies jwt token signature and returns its validated payload.
+
+    Verified payloads are memoized by token hash until the token expires, so
+    repeated bearer tokens skip HMAC verification and pydantic validation.
+    Raises `jwt.DecodeError` for invalid tokens. Expiry is still up to the caller.
+    """
+
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is None:
+        payload = jwt.decode(
+            token, key=config.settings.SECRET_KEY, algorithms=[JWT_ALGORITHM]
+        )
+        # JWT guarantees payload will be unchanged (and thus valid), no errors here
+        token_data = JWTTokenPayload(**payload)
+        ttl = token_data.expires_at - time.time()
+        if ttl > 0:
+            token_cache.set(key, token_data, ttl=ttl)
+    return token_data
+
+
 def generate_access_token_response(subject: str | int):
     """Generate tokens and return AccessTokenResponse"""
     access_token, expires_at, issued_at = create_jwt_token(
@@ -87,3 +129,45 @@ def get_password_hash(password: str) -> str:
     It takes about 0.3s for default 12 rounds of SECURITY_BCRYPT_DEFAULT_ROUNDS.
     """
     return PWD_CONTEXT.hash(password)
+
+
+async def _run_in_hashing_executor(func, *args):
+    """Runs blocking `func` in HASHING_EXECUTOR and records queue metrics."""
+
+    loop = asyncio.get_running_loop()
+    submitted_at = time.perf_counter()
+    dequeued = False
+    lock = threading.Lock()
+
+    def dequeue() -> bool:
+        nonlocal dequeued
+        with lock:
+            if dequeued:
+                return False
+            dequeued = True
+        HASHING_QUEUE_DEPTH.dec()
+        return True
+
+    def job():
+        if dequeue():
+            HASHING_WAIT_SECONDS.observe(time.perf_counter() - submitted_at)
+        return func(*args)
+
+    HASHING_QUEUE_DEPTH.inc()
+    try:
+        return await loop.run_in_executor(HASHING_EXECUTOR, job)
+    finally:
+        # job was cancelled before a worker picked it up
+        dequeue()
+
+
+async def async_verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Awaitable `verify_password`, runs in the bounded hashing executor"""
+    return await _run_in_hashing_executor(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def async_get_password_hash(password: str) -> str:
+    """Awaitable `get_password_hash`, runs in the bounded hashing executor"""
+    return await _run_in_hashing_executor(get_password_hash, password)
@@ -4,15 +4,149 @@ SQLAlchemy async engine and sessions tools
 https://docs.sqlalchemy.org/en/20/orm/extensions/asyncio.html
 """
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import itertools
+import time
 
-from app.core import config
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core import config, metrics, request_metrics
 
 if config.settings.ENVIRONMENT == "PYTEST":
     sqlalchemy_database_uri = config.settings.TEST_SQLALCHEMY_DATABASE_URI
 else:
     sqlalchemy_database_uri = config.settings.DEFAULT_SQLALCHEMY_DATABASE_URI
 
+POOL_CHECKOUT_SECONDS = metrics.histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool, waiting and connecting included",
+)
+POOL_TIMEOUTS = metrics.counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DATABASE_POOL_TIMEOUT"
+)
+REPLICA_FAILURES = metrics.counter(
+    "db_replica_failures_total", "Read replicas taken out of rotation"
+)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Default asyncio pool that also records checkout wait times."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            POOL_CHECKOUT_SECONDS.observe(waited)
+            request_metrics.add_pool_wait(waited)
+
+
+def create_engine(uri: str) -> AsyncEngine:
+    engine = create_async_engine(
+        uri,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=config.settings.DATABASE_POOL_SIZE,
+        max_overflow=config.settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=config.settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        pool_recycle=config.settings.DATABASE_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=config.settings.DATABASE_POOL_PRE_PING,
+        query_cache_size=config.settings.DATABASE_COMPILED_CACHE_SIZE,
+        connect_args={
+            # SQLAlchemy's prepared statements and asyncpg's own statement cache
+            "prepared_statement_cache_size": (
+                config.settings.DATABASE_STATEMENT_CACHE_SIZE
+            ),
+            "statement_cache_size": config.settings.DATABASE_STATEMENT_CACHE_SIZE,
+        },
+    )
+    request_metrics.instrument_engine(engine)
+    return engine
+
+
+class ReplicaSet:
+    """Round robin over read replica engines, skipping recently failed ones."""
+
+    def __init__(self, uris: list[str], retry_interval: float) -> None:
+        self.engines = [create_engine(uri) for uri in uris]
+        self.retry_interval = retry_interval
+        self._failed_until: dict[AsyncEngine, float] = {}
+        self._turn = itertools.count()
 
-async_engine = create_async_engine(sqlalchemy_database_uri, pool_pre_ping=True)
+    def pick(self) -> AsyncEngine | None:
+        """Returns next healthy replica, None if there is none."""
+        now = time.monotonic()
+        healthy = [
+            engine
+            for engine in self.engines
+            if self._failed_until.get(engine, 0.0) <= now
+        ]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def mark_failed(self, engine: AsyncEngine) -> None:
+        REPLICA_FAILURES.inc()
+        self._failed_until[engine] = time.monotonic() + self.retry_interval
+
+    def session(self, engine: AsyncEngine) -> AsyncSession:
+        """Session bound to replica `engine`, connecting on first use. When the
+        replica can not be reached it is marked failed and the session continues
+        on the primary."""
+        return AsyncSession(
+            bind=engine,
+            sync_session_class=ReplicaSession,
+            expire_on_commit=False,
+            info={"replica_set": self, "replica": engine},
+        )
+
+
+class ReplicaSession(Session):
+    """Sync session behind `ReplicaSet.session`."""
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except (OSError, exc.DBAPIError):
+            replica = self.info.get("replica")
+            if replica is None or engine is not replica.sync_engine:
+                raise
+            self.info["replica_set"].mark_failed(replica)
+            del self.info["replica"]
+            self.bind = async_engine.sync_engine
+            return super()._connection_for_bind(self.bind, execution_options, **kw)
+
+
+async_engine = create_engine(sqlalchemy_database_uri)
 async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+replicas = ReplicaSet(
+    config.settings.DATABASE_REPLICA_URIS,
+    retry_interval=config.settings.DATABASE_REPLICA_RETRY_SECONDS,
+)
+
+metrics.gauge(
+    "db_pool_checked_out",
+    "Connections currently in use",
+    function=lambda: async_engine.pool.checkedout(),
+)
+metrics.gauge(
+    "db_pool_checked_in",
+    "Idle connections held by the pool",
+    function=lambda: async_engine.pool.checkedin(),
+)
+metrics.gauge(
+    "db_pool_overflow",
+    "Connections opened beyond DATABASE_POOL_SIZE, negative while below it",
+    function=lambda: async_engine.pool.overflow(),
+)
@@ -0,0 +1,153 @@
+"""
+Write-behind batching for high-frequency `AnimalLog` inserts.
+
+Requests hand validated rows to `log_queue.submit` and return immediately, a
+background task started on first use writes them with one multi-row INSERT per
+`WRITE_BEHIND_BATCH_SIZE` rows or `WRITE_BEHIND_FLUSH_INTERVAL_MS`, whichever
+comes first. The queue is bounded, `submit` raises `asyncio.QueueFull` when it
+is full so callers can push back on clients. Rows live in the memory of a single
+worker until flushed, `drain` is awaited from the app lifespan on shutdown.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core import config, metrics
+from app.core.invalidation import publish
+from app.core.session import async_session
+from app.models import AnimalLog
+from app.utils.services import update_log_daily
+
+logger = logging.getLogger(__name__)
+
+FLUSHED_ROWS = metrics.counter(
+    "log_write_behind_flushed_rows_total", "Log rows written by the write-behind queue"
+)
+DROPPED_ROWS = metrics.counter(
+    "log_write_behind_dropped_rows_total",
+    "Log rows rejected by the database on flush, e.g. animal deleted meanwhile, "
+    "or lost to unexpected errors",
+)
+FLUSH_SECONDS = metrics.histogram(
+    "log_write_behind_flush_seconds", "Time spent writing one write-behind batch"
+)
+
+
+class WriteBehindQueue:
+    """Bounded in-process queue of `AnimalLog` rows flushed in batches."""
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize)
+        self._batch_ready = asyncio.Event()
+        self._draining = False
+        self._worker: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, row: dict[str, Any]) -> None:
+        """Enqueues `AnimalLog` column values, raises `asyncio.QueueFull`."""
+        self._queue.put_nowait(row)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Flushes everything queued so far and stops the background task."""
+        if self._worker is None:
+            return
+        self._draining = True
+        self._batch_ready.set()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Write-behind drain timed out, %d log rows lost", len(self))
+        finally:
+            self._worker.cancel()
+            self._worker = None
+            self._draining = False
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if not self._draining and self._queue.qsize() + 1 < self.batch_size:
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._batch_ready.wait(), self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._flush(batch)
+            except Exception:
+                # never let the worker die, later submits would have no consumer
+                DROPPED_ROWS.inc(len(batch))
+                logger.exception("Write-behind lost %d log rows", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        try:
+            await self._insert_retrying(batch)
+        except (IntegrityError, DataError):
+            # slow path isolating the rows the database rejects
+            for row in batch:
+                try:
+                    await self._insert_retrying([row])
+                except (IntegrityError, DataError):
+                    DROPPED_ROWS.inc()
+                    logger.warning("Write-behind dropped log %s", row["id"])
+
+    async def _insert_retrying(self, rows: list[dict[str, Any]]) -> None:
+        """Raises only for rows the database rejects. Rows were acknowledged
+        already, other errors are retried while the database is down."""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                await self._insert(rows)
+                FLUSH_SECONDS.observe(time.perf_counter() - started)
+                return
+            except (IntegrityError, DataError):
+                raise
+            except Exception:
+                attempt += 1
+                logger.exception("Write-behind flush failed, attempt %d", attempt)
+                await asyncio.sleep(min(2**attempt * 0.1, 5.0))
+
+    async def _insert(self, rows: list[dict[str, Any]]) -> None:
+        async with async_session() as session:
+            await session.execute(pg_insert(AnimalLog.__table__), rows)
+            await update_log_daily(
+                session,
+                [(row["animal_id"], row["date"], row["activity"], 1) for row in rows],
+            )
+            for row in rows:
+                publish(session, "log", row["animal_id"])
+            await session.commit()
+        FLUSHED_ROWS.inc(len(rows))
+
+
+log_queue = WriteBehindQueue(
+    maxsize=config.settings.WRITE_BEHIND_MAX_QUEUE_SIZE,
+    batch_size=config.settings.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=config.settings.WRITE_BEHIND_FLUSH_INTERVAL_MS / 1000,
+)
+metrics.gauge(
+    "log_write_behind_queue_depth",
+    "Log rows waiting in the write-behind queue",
+    function=lambda: len(log_queue),
+)
@@ -1,11 +1,25 @@
 """Main FastAPI app instance declaration."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from app.api.api import api_router
-from app.core import config
+from app.core import config, invalidation, metrics
+from app.core.request_metrics import MetricsMiddleware
+from app.core.write_behind import log_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    invalidation.listener.start()
+    yield
+    # flush logs accepted by write-behind endpoints before the worker exits
+    await log_queue.drain(config.settings.WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS)
+    await invalidation.listener.stop()
 
 
 app = FastAPI(
@@ -14,9 +28,20 @@ app = FastAPI(
     description=config.settings.DESCRIPTION,
     openapi_url="/openapi.json",
     docs_url="/",
+    lifespan=lifespan,
 )
 app.include_router(api_router)
 
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Metrics of the worker serving the request in the Prometheus text format.
+    Not authenticated, keep it off the public ingress."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # Sets all CORS enabled origins
 app.add_middleware(
     CORSMiddleware,
@@ -28,3 +53,6 @@ app.add_middleware(
 
 # Guards against HTTP Host Header attacks
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=config.settings.ALLOWED_HOSTS)
+
+# Per-route latency and database work, added last so it wraps everything else
+app.add_middleware(MetricsMiddleware)
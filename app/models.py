@@ -31,6 +31,7 @@ from sqlalchemy import (
     Integer,
     Interval,
     Numeric,
+    Index,
 )
 from decimal import Decimal
 from sqlalchemy.dialects.postgresql import UUID
@@ -175,6 +176,12 @@ class UserModel(AddressModel):
 
 class AnimalUserAssociation(BaseModel):
     __tablename__ = "animal_user_association"
+    __table_args__ = (
+        # ownership checks, `Animal.owners.any(id=...)`
+        Index("ix_animal_user_association_user_id_animal_id", "user_id", "animal_id"),
+        # owners of an animal, loading `Animal.owners`
+        Index("ix_animal_user_association_animal_id", "animal_id"),
+    )
 
     animal_id: Mapped[str] = mapped_column(
         UUID(as_uuid=False), ForeignKey("animal.id", ondelete="CASCADE"), nullable=True
@@ -223,6 +230,11 @@ class Animal(AddressModel):
 
 class AnimalWeightHistory(BaseModel):
     __tablename__ = "animal_weight_history"
+    __table_args__ = (
+        Index(
+            "ix_animal_weight_history_animal_id_change_date", "animal_id", "change_date"
+        ),
+    )
 
     weight: Mapped[float] = mapped_column(Float, nullable=False)
     change_date: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
@@ -237,6 +249,16 @@ class AnimalWeightHistory(BaseModel):
 
 class AnimalLog(BaseModel):
     __tablename__ = "animal_log"
+    __table_args__ = (
+        Index("ix_animal_log_animal_id_date_activity", "animal_id", "date", "activity"),
+        # client supplied keys make bulk ingestion retries idempotent
+        Index(
+            "ix_animal_log_animal_id_idempotency_key",
+            "animal_id",
+            "idempotency_key",
+            unique=True,
+        ),
+    )
 
     animal_id: Mapped[str] = mapped_column(
         UUID(as_uuid=False), ForeignKey("animal.id", ondelete="CASCADE"), nullable=False
@@ -251,6 +273,23 @@ class AnimalLog(BaseModel):
     medication: Mapped[str] = mapped_column(Text, nullable=True)
     food_name: Mapped[str] = mapped_column(Text, nullable=True)
     medication_brand: Mapped[str] = mapped_column(Text, nullable=True)
+    idempotency_key: Mapped[str] = mapped_column(String(128), nullable=True)
+
+
+class AnimalLogDaily(Base):
+    """Per day activity counts of `AnimalLog`, kept in sync by the log endpoints,
+    see `services.update_log_daily`, and rebuilt by `app.backfill_log_daily`"""
+
+    __tablename__ = "animal_log_daily"
+
+    animal_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("animal.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    activity: Mapped[str] = mapped_column(Enum(ActivityTypes), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
 
 class Appointment(BaseModel):
@@ -0,0 +1,167 @@
+"""
+Hot statements, built once per process instead of once per request.
+
+A `select(...)` built per request costs Python time twice before its compiled
+form is found in the engine's compiled cache: constructing the object and
+walking it to compute the cache key. The statements below are module level
+constants with `bindparam`s, their cache key is memoized on the object, so
+executing one costs a dict lookup plus binding the values passed to
+`session.execute`. Statements with optional clauses are pre-built once per
+combination of clauses, the functions pick one and return `(statement, params)`.
+
+Activity filters use `= ANY(:activity_names)` with one array parameter instead
+of an expanding IN, so every filter renders the same SQL and shares one
+prepared statement per connection, see DATABASE_STATEMENT_CACHE_SIZE.
+
+python -m benchmarks.statement_compile
+"""
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import ARRAY, Select, any_, bindparam, exists, func, select, tuple_
+
+from app.models import AnimalLog, AnimalUserAssociation, AnimalWeightHistory, User
+
+# params: user_id
+USER_BY_ID: Select = select(User).where(User.id == bindparam("user_id"))
+
+# params: user_id
+USER_ACTIVE_BY_ID: Select = select(User.active).where(User.id == bindparam("user_id"))
+
+# params: user_id, animal_id
+OWNS_ANIMAL: Select = select(
+    exists().where(
+        AnimalUserAssociation.user_id == bindparam("user_id"),
+        AnimalUserAssociation.animal_id == bindparam("animal_id"),
+    )
+)
+
+
+def _fingerprint(model: Any, *criteria: Any) -> Select:
+    return select(
+        func.count(), func.max(model.updated_at), func.sum(model.version)
+    ).where(*criteria)
+
+
+def _window(model: Any, date_column: Any) -> tuple:
+    """params: animal_id, start_date"""
+    return (
+        model.animal_id == bindparam("animal_id"),
+        date_column >= bindparam("start_date"),
+    )
+
+
+def _page(
+    model: Any, date_column: Any, descending: bool, cursor: bool, *criteria: Any
+) -> Select:
+    """Keyset page of `model` ordered by (date, id), params: limit and
+    cursor_date, cursor_id if `cursor`"""
+    order_by = (date_column, model.id)
+    statement = (
+        select(model)
+        .where(*_window(model, date_column), *criteria)
+        .order_by(*(column.desc() if descending else column for column in order_by))
+        .limit(bindparam("limit"))
+    )
+    if cursor:
+        position = tuple_(*order_by)
+        after = tuple_(
+            bindparam("cursor_date", type_=date_column.type),
+            bindparam("cursor_id", type_=model.id.type),
+        )
+        statement = statement.where(
+            position < after if descending else position > after
+        )
+    return statement
+
+
+_ACTIVITY_IN = AnimalLog.activity == any_(
+    bindparam("activity_names", type_=ARRAY(AnimalLog.activity.type))
+)
+
+_WEIGHT_FINGERPRINT = _fingerprint(
+    AnimalWeightHistory, *_window(AnimalWeightHistory, AnimalWeightHistory.change_date)
+)
+
+# keyed by cursor given
+_WEIGHT_PAGE = {
+    cursor: _page(AnimalWeightHistory, AnimalWeightHistory.change_date, False, cursor)
+    for cursor in (False, True)
+}
+
+# keyed by activity filter given
+_LOG_FINGERPRINT = {
+    False: _fingerprint(AnimalLog, *_window(AnimalLog, AnimalLog.date)),
+    True: _fingerprint(AnimalLog, *_window(AnimalLog, AnimalLog.date), _ACTIVITY_IN),
+}
+
+# keyed by (activity filter given, cursor given)
+_LOG_PAGE = {
+    (filtered, cursor): _page(
+        AnimalLog,
+        AnimalLog.date,
+        True,
+        cursor,
+        *([_ACTIVITY_IN] if filtered else []),
+    )
+    for filtered in (False, True)
+    for cursor in (False, True)
+}
+
+
+def _params(
+    animal_id: str,
+    start_date: datetime,
+    limit: int | None = None,
+    cursor: tuple[datetime, str] | None = None,
+    activity_names: list[str] | None = None,
+) -> dict[str, Any]:
+    params: dict[str, Any] = {"animal_id": animal_id, "start_date": start_date}
+    if limit is not None:
+        params["limit"] = limit
+    if cursor is not None:
+        params["cursor_date"], params["cursor_id"] = cursor
+    if activity_names:
+        params["activity_names"] = activity_names
+    return params
+
+
+def weight_fingerprint(
+    animal_id: str, start_date: datetime
+) -> tuple[Select, dict[str, Any]]:
+    """`collection_fingerprint` of the weight history window"""
+    return _WEIGHT_FINGERPRINT, _params(animal_id, start_date)
+
+
+def weight_page(
+    animal_id: str,
+    start_date: datetime,
+    limit: int,
+    cursor: tuple[datetime, str] | None,
+) -> tuple[Select, dict[str, Any]]:
+    """Weight history window, oldest first, starting after `cursor`"""
+    statement = _WEIGHT_PAGE[cursor is not None]
+    return statement, _params(animal_id, start_date, limit, cursor)
+
+
+def log_fingerprint(
+    animal_id: str, start_date: datetime, activity_names: list[str]
+) -> tuple[Select, dict[str, Any]]:
+    """`collection_fingerprint` of the log window, empty `activity_names`
+    matches every activity"""
+    statement = _LOG_FINGERPRINT[bool(activity_names)]
+    return statement, _params(animal_id, start_date, activity_names=activity_names)
+
+
+def log_page(
+    animal_id: str,
+    start_date: datetime,
+    activity_names: list[str],
+    limit: int,
+    cursor: tuple[datetime, str] | None,
+) -> tuple[Select, dict[str, Any]]:
+    """Log window, newest first, starting before `cursor`, empty
+    `activity_names` matches every activity"""
+    statement = _LOG_PAGE[(bool(activity_names), cursor is not None)]
+    return statement, _params(animal_id, start_date, limit, cursor, activity_names)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from datetime import date, datetime
+from uuid import UUID
 from app.models import AnimalType, ActivityTypes
 # from sqlalchemy import  DateTime
 
@@ -68,19 +69,10 @@ class AnimalLogCreateRequest(BaseModel):
     comments: str
     activity: ActivityTypes
     date: datetime
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
+
+
+class AnimalLogBulkItemRequest(BaseModel):
+    animal_id: UUID
+    log: AnimalLogCreateRequest
+    # retried items with the same key for the same animal are stored only once
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=128)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal
 from pydantic import BaseModel, ConfigDict, EmailStr
 from app.models import AnimalType, ActivityTypes
 from datetime import date, datetime
@@ -34,6 +34,11 @@ class AnimalBaseResponse(BaseResponse):
     owners: List[UserResponse] = []
 
 
+class AnimalPageResponse(BaseResponse):
+    items: List[AnimalBaseResponse]
+    next_cursor: Optional[str] = None
+
+
 class AnimalExtendedResponse(BaseResponse):
     id: str
     name: str
@@ -55,7 +60,37 @@ class AnimalWeightHistoryResponse(BaseModel):
     change_date: datetime
     # animal_id: str
 
-class AnimalLogResponse(BaseModel):
+
+class AnimalWeightHistoryPageResponse(BaseModel):
+    items: List[AnimalWeightHistoryResponse]
+    next_cursor: Optional[str] = None
+
+
+class AnimalWeightBucketResponse(BaseModel):
+    bucket_start: datetime
+    avg: float
+    min: float
+    max: float
+    count: int
+
+
+class AnimalWeightSeriesResponse(BaseModel):
+    bucket: str
+    items: List[AnimalWeightBucketResponse]
+
+
+class BulkItemErrorResponse(BaseModel):
+    index: int
+    errors: List[str]
+
+
+class AnimalWeightHistoryBulkResponse(BaseModel):
+    created: int
+    ids: List[str]
+    errors: List[BulkItemErrorResponse] = []
+
+
+class AnimalLogResponse(BaseResponse):
     id: str
     animal_id: str
     comments: str
@@ -63,3 +98,63 @@ class AnimalLogResponse(BaseModel):
     date: datetime
 
 
+class AnimalLogAcceptedResponse(BaseModel):
+    id: str
+
+
+class AnimalLogExportResponse(BaseResponse):
+    id: str
+    animal_id: str
+    appointment_id: Optional[str] = None
+    date: datetime
+    activity: ActivityTypes
+    comments: Optional[str] = None
+    procedures: Optional[str] = None
+    medication: Optional[str] = None
+    food_name: Optional[str] = None
+    medication_brand: Optional[str] = None
+
+
+class AnimalLogPageResponse(BaseResponse):
+    items: List[AnimalLogResponse]
+    next_cursor: Optional[str] = None
+
+
+class AnimalLogDailyResponse(BaseResponse):
+    day: date
+    activity: ActivityTypes
+    count: int
+
+
+class AnimalLogSummaryResponse(BaseResponse):
+    items: List[AnimalLogDailyResponse]
+
+
+class AnimalLogBulkItemResponse(BaseModel):
+    index: int
+    status: Literal["created", "duplicate", "animal_not_found"]
+    id: Optional[str] = None
+
+
+class AnimalLogBulkResponse(BaseModel):
+    created: int
+    items: List[AnimalLogBulkItemResponse]
+
+
+class HistogramBucketResponse(BaseModel):
+    le: float
+    count: int
+
+
+class PoolStatusResponse(BaseModel):
+    size: int
+    max_overflow: int
+    timeout: float
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkout_count: int
+    checkout_seconds_sum: float
+    # cumulative counts, checkouts slower than the last bound are only in the total
+    checkout_seconds_buckets: List[HistogramBucketResponse]
+    timeouts: int
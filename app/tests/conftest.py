@@ -1,13 +1,22 @@
 import asyncio
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
-from sqlalchemy import delete, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from app.core import config, security
+from app.core.cache import (
+    ownership_cache,
+    recent_writers,
+    token_cache,
+    user_active_cache,
+    user_cache,
+)
+from app.core.response_cache import response_cache
 from app.core.session import async_engine, async_session
 from app.main import app
 from app.models import Base, User, Animal
@@ -64,9 +73,55 @@ async def session(test_db_setup_sessionmaker) -> AsyncGenerator[AsyncSession, No
         yield session
 
         # delete all data from all tables after test
-        for name, table in Base.metadata.tables.items():
+        for table in reversed(Base.metadata.sorted_tables):
             await session.execute(delete(table))
         await session.commit()
+        user_cache.clear()
+        user_active_cache.clear()
+        token_cache.clear()
+        ownership_cache.clear()
+        recent_writers.clear()
+        await response_cache.clear()
+
+
+@contextmanager
+def record_statements(engine: AsyncEngine = async_engine) -> Iterator[list[str]]:
+    """Collects SQL statements executed on `engine` inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@contextmanager
+def max_statements(budget: int) -> Iterator[list[str]]:
+    """Fails the test when the block executes more than `budget` statements,
+    listing all of them"""
+    with record_statements() as statements:
+        yield statements
+    if len(statements) > budget:
+        listing = "\n".join(
+            f"  {number}. {' '.join(statement.split())}"
+            for number, statement in enumerate(statements, 1)
+        )
+        pytest.fail(
+            f"{len(statements)} SQL statements executed, budget is {budget}:\n"
+            f"{listing}",
+            pytrace=False,
+        )
+
+
+@pytest.fixture
+def query_budget() -> Callable[[int], AbstractContextManager[list[str]]]:
+    """`with query_budget(3): await client.get(...)` caps the statements one
+    request may execute, catching N+1s and redundant queries"""
+    return max_statements
 
 
 @pytest_asyncio.fixture(scope="session")
@@ -1,7 +1,12 @@
 # /app/tests/test_animals.py
+import asyncio
+import base64
+import json
+from collections.abc import AsyncGenerator
+import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, event, func, insert
 from datetime import datetime
 from uuid import UUID
 from sqlalchemy.orm import joinedload
@@ -9,17 +14,41 @@ from app.schemas.responses import AnimalBaseResponse
 from fastapi import status
 from datetime import datetime, timedelta
 from sqlalchemy.orm.session import Session
-from app.tests.conftest import default_animal1_id
+from app.tests.conftest import (
+    default_animal1_id,
+    default_user_email,
+    record_statements,
+)
 
 
+from app import backfill_log_daily
+from app.api import deps
+from app.core import config, security, write_behind
+from app.core.cache import (
+    invalidate_user,
+    ownership_cache,
+    user_active_cache,
+    user_cache,
+)
+from app.core.response_cache import response_cache
+from app.core.session import ReplicaSet, async_engine
 from app.main import app
-from app.models import Animal, User, AnimalWeightHistory, AnimalUserAssociation
+from app.models import (
+    ActivityTypes,
+    Animal,
+    AnimalLog,
+    AnimalLogDaily,
+    AnimalType,
+    AnimalUserAssociation,
+    AnimalWeightHistory,
+    User,
+)
 
 import uuid
 
 
 async def test_create_new_animal(
-    client: AsyncClient, default_user_headers, session: AsyncSession
+    client: AsyncClient, default_user_headers, session: AsyncSession, query_budget
 ):
     animal_data = {
         "name": "animal_1",
@@ -28,11 +57,12 @@ async def test_create_new_animal(
         "active": True,
     }
 
-    response = await client.post(
-        app.url_path_for("create_new_animal"),
-        headers=default_user_headers,
-        json=animal_data,
-    )
+    with query_budget(4):
+        response = await client.post(
+            app.url_path_for("create_new_animal"),
+            headers=default_user_headers,
+            json=animal_data,
+        )
     assert response.status_code == 201
 
     response_data = response.json()
@@ -59,16 +89,20 @@ async def test_get_all_animals(
     default_user_headers,
     default_animal1: Animal,
     default_animal2: Animal,
+    query_budget,
 ):
     # Retrieve all animals
-    response = await client.get(
-        app.url_path_for("get_all_animals"), headers=default_user_headers
-    )
+    with query_budget(4):
+        response = await client.get(
+            app.url_path_for("get_all_animals"), headers=default_user_headers
+        )
 
     assert response.status_code == status.HTTP_200_OK
 
     # Validate response
-    animals = [AnimalBaseResponse.model_validate(animal) for animal in response.json()]
+    animals = [
+        AnimalBaseResponse.model_validate(animal) for animal in response.json()["items"]
+    ]
     assert len(animals) >= 2  # Expect at least the two default animals
 
     # Check that the default animals are in the response
@@ -94,6 +128,7 @@ async def test_update_animal(
     default_user_headers,
     default_animal1: Animal,
     session: AsyncSession,
+    query_budget,
 ):
     animal_data = {
         "identifier": "1234",
@@ -108,11 +143,12 @@ async def test_update_animal(
         "active": True,
     }
 
-    response = await client.patch(
-        app.url_path_for("update_animal", animal_id=default_animal1.id),
-        headers=default_user_headers,
-        json=animal_data,
-    )
+    with query_budget(4):
+        response = await client.patch(
+            app.url_path_for("update_animal", animal_id=default_animal1.id),
+            headers=default_user_headers,
+            json=animal_data,
+        )
     assert response.status_code == status.HTTP_200_OK
 
     response_data = response.json()
@@ -145,17 +181,19 @@ async def test_create_animal_weight(
     default_user_headers,
     default_animal1: Animal,
     session: AsyncSession,
+    query_budget,
 ):
     animal_data = {
         "weight": 1.5,
         "change_date": datetime.strptime("2022-01-01", "%Y-%m-%d").isoformat(),
     }
 
-    response = await client.post(
-        app.url_path_for("add_weight", animal_id=default_animal1.id),
-        headers=default_user_headers,
-        json=animal_data,
-    )
+    with query_budget(4):
+        response = await client.post(
+            app.url_path_for("add_weight", animal_id=default_animal1.id),
+            headers=default_user_headers,
+            json=animal_data,
+        )
     assert response.status_code == status.HTTP_200_OK
     await session.commit()
 
@@ -198,3 +236,998 @@ async def test_create_animal_weight(
 
 #         # Commit the session after adding weight history records
 #         await session.commit()
+
+
+async def test_get_all_animals_skips_user_lookup(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    await client.get(app.url_path_for("get_all_animals"), headers=default_user_headers)
+    user_lookups_before = user_cache.hits.value + user_cache.misses.value
+    principal_hits_before = user_active_cache.hits.value
+
+    response = await client.get(
+        app.url_path_for("get_all_animals"), headers=default_user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert user_cache.hits.value + user_cache.misses.value == user_lookups_before
+    assert user_active_cache.hits.value == principal_hits_before + 1
+
+
+async def test_get_all_animals_inactive_user(
+    client: AsyncClient,
+    default_user_headers,
+    default_user: User,
+    session: AsyncSession,
+):
+    user = await session.get(User, default_user.id)
+    user.active = False
+    await session.commit()
+    invalidate_user(default_user.id)
+
+    response = await client.get(
+        app.url_path_for("get_all_animals"), headers=default_user_headers
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_get_weight_history_window_and_pages(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    query_budget,
+):
+    now = datetime.now()
+    change_dates = [now - timedelta(days=30)] + [
+        now - timedelta(minutes=minutes) for minutes in (3, 2, 1)
+    ]
+    for change_date in change_dates:
+        response = await client.post(
+            app.url_path_for("add_weight", animal_id=default_animal1.id),
+            headers=default_user_headers,
+            json={"weight": 1.5, "change_date": change_date.isoformat()},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    url = app.url_path_for("get_weight_history", animal_id=default_animal1.id)
+    with query_budget(2):
+        response = await client.get(
+            url,
+            headers=default_user_headers,
+            params={"range": 1, "unit": "days", "limit": 2},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert len(first_page["items"]) == 2
+    assert first_page["next_cursor"] is not None
+
+    with query_budget(2):
+        response = await client.get(
+            url,
+            headers=default_user_headers,
+            params={"limit": 2, "cursor": first_page["next_cursor"]},
+        )
+    second_page = response.json()
+    assert len(second_page["items"]) == 1
+    assert second_page["next_cursor"] is None
+
+    returned = [
+        datetime.fromisoformat(item["change_date"])
+        for item in first_page["items"] + second_page["items"]
+    ]
+    assert returned == change_dates[1:]
+
+
+async def test_get_weight_history_invalid_cursor(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    response = await client.get(
+        app.url_path_for("get_weight_history", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        params={"cursor": "invalid"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    "position, id",
+    [
+        # not a uuid string
+        ("2020-01-01T00:00:00", 2),
+        # timestamp columns are naive
+        ("2020-01-01T00:00:00+02:00", "79909c98-f3fc-4137-a2a4-d8d6a6e8900e"),
+    ],
+)
+@pytest.mark.parametrize("route", ["get_weight_history", "get_all_animals", "get_log"])
+async def test_crafted_cursor_is_rejected(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    route: str,
+    position: str,
+    id,
+):
+    cursor = base64.urlsafe_b64encode(json.dumps([position, id]).encode()).decode()
+    params = {} if route == "get_all_animals" else {"animal_id": default_animal1.id}
+    response = await client.get(
+        app.url_path_for(route, **params),
+        headers=default_user_headers,
+        params={"cursor": cursor},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+async def test_get_all_animals_pages(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    default_animal2: Animal,
+):
+    url = app.url_path_for("get_all_animals")
+    response = await client.get(url, headers=default_user_headers, params={"limit": 1})
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert len(first_page["items"]) == 1
+    assert first_page["next_cursor"] is not None
+
+    response = await client.get(
+        url,
+        headers=default_user_headers,
+        params={"limit": 1, "cursor": first_page["next_cursor"]},
+    )
+    second_page = response.json()
+    assert len(second_page["items"]) == 1
+    assert second_page["next_cursor"] is None
+
+    animal_ids = [animal["id"] for animal in first_page["items"] + second_page["items"]]
+    assert animal_ids == [default_animal1.id, default_animal2.id]
+    assert second_page["items"][0]["owners"][0]["email"] == default_user_email
+
+
+async def test_get_log_newest_first_pages(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    query_budget,
+):
+    now = datetime.now()
+    for minutes, activity in [(3, "Food"), (2, "Water"), (1, "Food")]:
+        response = await client.post(
+            app.url_path_for("add_log", animal_id=default_animal1.id),
+            headers=default_user_headers,
+            json={
+                "comments": f"{minutes} minutes ago",
+                "activity": activity,
+                "date": (now - timedelta(minutes=minutes)).isoformat(),
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    url = app.url_path_for("get_log", animal_id=default_animal1.id)
+    with query_budget(2):
+        response = await client.get(
+            url,
+            headers=default_user_headers,
+            params={"activity_types": ["Food"], "limit": 1},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert [log["comments"] for log in first_page["items"]] == ["1 minutes ago"]
+    assert first_page["next_cursor"] is not None
+
+    response = await client.get(
+        url,
+        headers=default_user_headers,
+        params={
+            "activity_types": ["Food"],
+            "limit": 1,
+            "cursor": first_page["next_cursor"],
+        },
+    )
+    second_page = response.json()
+    assert [log["comments"] for log in second_page["items"]] == ["3 minutes ago"]
+    assert second_page["next_cursor"] is None
+
+
+async def test_get_log_limit_is_capped(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    response = await client.get(
+        app.url_path_for("get_log", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        params={"limit": config.settings.PAGINATION_MAX_LIMIT + 1},
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_export_log(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    session: AsyncSession,
+):
+    now = datetime.now()
+    for years in (10, 1):
+        session.add(
+            AnimalLog(
+                animal_id=default_animal1.id,
+                date=now - timedelta(days=365 * years),
+                activity=ActivityTypes.Medication,
+                comments="yearly",
+                medication="Heartgard",
+                medication_brand="Boehringer",
+            )
+        )
+        await session.commit()
+
+    response = await client.get(
+        app.url_path_for("export_log", animal_id=default_animal1.id),
+        headers=default_user_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 2
+    assert rows[0]["date"] < rows[1]["date"]
+    assert rows[0]["medication"] == "Heartgard"
+    assert rows[0]["medication_brand"] == "Boehringer"
+    assert rows[0]["activity"] == "Medication"
+
+
+async def test_export_log_not_owned(client: AsyncClient, default_user_headers):
+    response = await client.get(
+        app.url_path_for("export_log", animal_id=str(uuid.uuid4())),
+        headers=default_user_headers,
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_add_weight_bulk(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    session: AsyncSession,
+    query_budget,
+):
+    now = datetime.now()
+    items = [
+        {"weight": 1.0 + i, "change_date": (now - timedelta(minutes=i)).isoformat()}
+        for i in range(100)
+    ]
+    items.insert(10, {"weight": "heavy", "change_date": now.isoformat()})
+    items.insert(20, {"weight": 1.0})
+
+    with query_budget(4):
+        response = await client.post(
+            app.url_path_for("add_weight_bulk", animal_id=default_animal1.id),
+            headers=default_user_headers,
+            json=items,
+        )
+    assert response.status_code == status.HTTP_200_OK
+    response_data = response.json()
+    assert response_data["created"] == 100
+    assert len(response_data["ids"]) == 100
+    assert [error["index"] for error in response_data["errors"]] == [10, 20]
+    assert response_data["errors"][1]["errors"] == ["change_date: Field required"]
+
+    result = await session.execute(
+        select(AnimalWeightHistory).where(
+            AnimalWeightHistory.animal_id == default_animal1.id
+        )
+    )
+    assert len(result.scalars().all()) == 100
+
+
+async def test_add_weight_bulk_too_many_items(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    item = {"weight": 1.0, "change_date": datetime.now().isoformat()}
+    response = await client.post(
+        app.url_path_for("add_weight_bulk", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        json=[item] * (config.settings.BULK_INGEST_MAX_ITEMS + 1),
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_add_log_bulk_is_idempotent(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    default_animal2: Animal,
+    session: AsyncSession,
+    query_budget,
+):
+    now = datetime.now().isoformat()
+    items = [
+        {
+            "animal_id": animal.id,
+            "idempotency_key": f"feeder-{animal.id}-{activity}",
+            "log": {"comments": "bowl", "activity": activity, "date": now},
+        }
+        for animal in (default_animal1, default_animal2)
+        for activity in ("Food", "Water")
+    ]
+    items.append(
+        {
+            "animal_id": str(uuid.uuid4()),
+            "log": {"comments": "not mine", "activity": "Food", "date": now},
+        }
+    )
+    url = app.url_path_for("add_log_bulk")
+
+    with query_budget(5):
+        response = await client.post(url, headers=default_user_headers, json=items)
+    assert response.status_code == status.HTTP_200_OK
+    first_attempt = response.json()
+    assert first_attempt["created"] == 4
+    assert [item["status"] for item in first_attempt["items"]] == [
+        "created",
+        "created",
+        "created",
+        "created",
+        "animal_not_found",
+    ]
+
+    # client retry after a timeout
+    response = await client.post(url, headers=default_user_headers, json=items)
+    assert response.status_code == status.HTTP_200_OK
+    retry = response.json()
+    assert retry["created"] == 0
+    assert [item["status"] for item in retry["items"][:4]] == ["duplicate"] * 4
+    assert [item["id"] for item in retry["items"][:4]] == [
+        item["id"] for item in first_attempt["items"][:4]
+    ]
+
+    result = await session.execute(
+        select(AnimalLog).where(
+            AnimalLog.animal_id.in_([default_animal1.id, default_animal2.id])
+        )
+    )
+    assert len(result.scalars().all()) == 4
+
+    # retries must not be counted twice by the rollup
+    result = await session.execute(select(func.sum(AnimalLogDaily.count)))
+    assert result.scalar() == 4
+
+
+async def other_user_animal(session: AsyncSession) -> Animal:
+    other_user = User(email="yennefer@vengerberg.pl", hashed_password="x")
+    animal = Animal(
+        name="Roach",
+        animal_types=AnimalType.Horse,
+        date_of_birth=datetime.strptime("2020-01-01", "%Y-%m-%d").date(),
+    )
+    animal.owners.append(other_user)
+    session.add(animal)
+    await session.commit()
+    return animal
+
+
+async def test_add_weight_checks_ownership_with_single_query(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    with record_statements() as statements:
+        response = await client.post(
+            app.url_path_for("add_weight", animal_id=default_animal1.id),
+            headers=default_user_headers,
+            json={"weight": 4.2, "change_date": datetime.now().isoformat()},
+        )
+    assert response.status_code == status.HTTP_200_OK
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    ownership_checks = [s for s in selects if "animal_user_association" in s]
+    assert len(ownership_checks) == 1
+    assert "EXISTS" in ownership_checks[0]
+    assert not [s for s in selects if "FROM animal " in s or "FROM animal\n" in s]
+
+
+async def test_add_weight_not_owned(
+    client: AsyncClient, default_user_headers, session: AsyncSession
+):
+    animal = await other_user_animal(session)
+
+    response = await client.post(
+        app.url_path_for("add_weight", animal_id=animal.id),
+        headers=default_user_headers,
+        json={"weight": 4.2, "change_date": datetime.now().isoformat()},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    result = await session.execute(
+        select(AnimalWeightHistory).where(AnimalWeightHistory.animal_id == animal.id)
+    )
+    assert result.scalars().first() is None
+
+
+async def test_get_weight_history_invalid_animal_id(
+    client: AsyncClient, default_user_headers
+):
+    response = await client.get(
+        app.url_path_for("get_weight_history", animal_id="not-a-uuid"),
+        headers=default_user_headers,
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_delete_log_not_owned(
+    client: AsyncClient, default_user_headers, session: AsyncSession
+):
+    animal = await other_user_animal(session)
+    log = AnimalLog(
+        animal_id=animal.id, date=datetime.now(), activity=ActivityTypes.Food
+    )
+    session.add(log)
+    await session.commit()
+    log_id = log.id
+
+    response = await client.delete(
+        app.url_path_for("delete_log", log_id=log_id), headers=default_user_headers
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    session.expire_all()
+    result = await session.execute(select(AnimalLog).where(AnimalLog.id == log_id))
+    assert result.scalars().one_or_none() is not None
+
+
+async def test_update_log_not_owned(
+    client: AsyncClient, default_user_headers, session: AsyncSession
+):
+    animal = await other_user_animal(session)
+    date = datetime(2023, 1, 1, 7, 0)
+    log = AnimalLog(
+        animal_id=animal.id,
+        date=date,
+        activity=ActivityTypes.Food,
+        comments="hay",
+    )
+    session.add(log)
+    await session.commit()
+    log_id, animal_id = log.id, animal.id
+
+    response = await client.put(
+        app.url_path_for("update_log", log_id=log_id),
+        headers=default_user_headers,
+        json={
+            "comments": "mine now",
+            "activity": "Water",
+            "date": "2023-01-01T08:00:00",
+        },
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    session.expire_all()
+    result = await session.execute(select(AnimalLog).where(AnimalLog.id == log_id))
+    log = result.scalars().one()
+    assert (log.animal_id, log.date, log.activity, log.comments) == (
+        animal_id,
+        date,
+        ActivityTypes.Food,
+        "hay",
+    )
+
+
+async def test_ownership_cache_skips_query(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    url = app.url_path_for("get_weight_history", animal_id=default_animal1.id)
+    response = await client.get(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    hits = ownership_cache.hits.value
+    with record_statements() as statements:
+        response = await client.get(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert ownership_cache.hits.value == hits + 1
+    assert not [s for s in statements if "animal_user_association" in s]
+
+
+async def test_delete_animal_invalidates_ownership_cache(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    query_budget,
+):
+    url = app.url_path_for("get_weight_history", animal_id=default_animal1.id)
+    response = await client.get(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(ownership_cache) == 1
+
+    with query_budget(5):
+        response = await client.delete(
+            app.url_path_for("delete_animal", animal_id=default_animal1.id),
+            headers=default_user_headers,
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(ownership_cache) == 0
+
+    response = await client.get(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_get_weight_series(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    session: AsyncSession,
+    query_budget,
+):
+    # hourly readings over 3 full days
+    start = datetime(2023, 3, 1)
+    await session.execute(
+        insert(AnimalWeightHistory),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "animal_id": default_animal1.id,
+                "weight": 10.0 + day + hour / 100,
+                "change_date": start + timedelta(days=day, hours=hour),
+            }
+            for day in range(3)
+            for hour in range(24)
+        ],
+    )
+    await session.commit()
+
+    url = app.url_path_for("get_weight_series", animal_id=default_animal1.id)
+    with query_budget(4):
+        response = await client.get(
+            url, headers=default_user_headers, params={"bucket": "day", "unit": "all"}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    response_data = response.json()
+    assert response_data["bucket"] == "day"
+    assert [item["bucket_start"] for item in response_data["items"]] == [
+        "2023-03-01T00:00:00",
+        "2023-03-02T00:00:00",
+        "2023-03-03T00:00:00",
+    ]
+    first = response_data["items"][0]
+    assert first["count"] == 24
+    assert first["min"] == 10.0
+    assert first["max"] == 10.23
+    assert round(first["avg"], 3) == 10.115
+
+    response = await client.get(
+        url, headers=default_user_headers, params={"bucket": "month", "unit": "all"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["count"] for item in response.json()["items"]] == [72]
+
+    response = await client.get(
+        url, headers=default_user_headers, params={"bucket": "hour"}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_log_summary_follows_log_changes(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    query_budget,
+):
+    today = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    add_url = app.url_path_for("add_log", animal_id=default_animal1.id)
+    log_ids = []
+    for date, activity in [
+        (yesterday, "Vomit"),
+        (yesterday, "Vomit"),
+        (today, "Vomit"),
+        (today, "Seizure"),
+    ]:
+        response = await client.post(
+            add_url,
+            headers=default_user_headers,
+            json={"comments": "", "activity": activity, "date": date.isoformat()},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        log_ids.append(response.json()["id"])
+
+    # move one of yesterday's vomits to a medication today, delete the seizure
+    response = await client.put(
+        app.url_path_for("update_log", log_id=log_ids[0]),
+        headers=default_user_headers,
+        json={"comments": "", "activity": "Medication", "date": today.isoformat()},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = await client.delete(
+        app.url_path_for("delete_log", log_id=log_ids[3]),
+        headers=default_user_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    url = app.url_path_for("get_log_summary", animal_id=default_animal1.id)
+    with query_budget(1):
+        response = await client.get(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["items"] == [
+        {"day": yesterday.date().isoformat(), "activity": "Vomit", "count": 1},
+        {"day": today.date().isoformat(), "activity": "Vomit", "count": 1},
+        {"day": today.date().isoformat(), "activity": "Medication", "count": 1},
+    ]
+
+    response = await client.get(
+        url, headers=default_user_headers, params={"activity_types": ["Medication"]}
+    )
+    assert [item["activity"] for item in response.json()["items"]] == ["Medication"]
+
+
+async def test_backfill_log_daily(default_animal1: Animal, session: AsyncSession):
+    now = datetime.now()
+    await session.execute(
+        insert(AnimalLog),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "animal_id": default_animal1.id,
+                "date": now - timedelta(days=day % 3),
+                "activity": ActivityTypes.Food,
+            }
+            for day in range(9)
+        ],
+    )
+    await session.commit()
+
+    await backfill_log_daily.main()
+
+    result = await session.execute(
+        select(AnimalLogDaily.count).where(
+            AnimalLogDaily.animal_id == default_animal1.id
+        )
+    )
+    assert result.scalars().all() == [3, 3, 3]
+
+
+async def test_add_log_async(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    session: AsyncSession,
+):
+    url = app.url_path_for("add_log_async", animal_id=default_animal1.id)
+    log_ids = []
+    for _ in range(3):
+        response = await client.post(
+            url,
+            headers=default_user_headers,
+            json={
+                "comments": "bowl",
+                "activity": "Water",
+                "date": datetime.now().isoformat(),
+            },
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        log_ids.append(response.json()["id"])
+
+    await write_behind.log_queue.drain()
+
+    result = await session.execute(
+        select(AnimalLog.id).where(AnimalLog.animal_id == default_animal1.id)
+    )
+    assert sorted(result.scalars().all()) == sorted(log_ids)
+    result = await session.execute(select(func.sum(AnimalLogDaily.count)))
+    assert result.scalar() == 3
+
+
+async def test_add_log_async_queue_full(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def submit(row):
+        raise asyncio.QueueFull
+
+    monkeypatch.setattr(write_behind.log_queue, "submit", submit)
+    response = await client.post(
+        app.url_path_for("add_log_async", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        json={"comments": "", "activity": "Food", "date": datetime.now().isoformat()},
+    )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+async def test_get_weight_history_etag(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    url = app.url_path_for("get_weight_history", animal_id=default_animal1.id)
+    response = await client.get(url, headers=default_user_headers)
+    etag = response.headers["ETag"]
+
+    with record_statements() as statements:
+        response = await client.get(
+            url, headers={**default_user_headers, "If-None-Match": etag}
+        )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not [
+        s for s in statements if "FROM animal_weight_history" in s and "count" not in s
+    ]
+
+    # other pages of the same window are other representations
+    response = await client.get(
+        url,
+        headers={**default_user_headers, "If-None-Match": etag},
+        params={"limit": 1},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.post(
+        app.url_path_for("add_weight", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        json={"weight": 4.2, "change_date": datetime.now().isoformat()},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.get(
+        url, headers={**default_user_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["items"]) == 1
+    assert response.headers["ETag"] != etag
+
+
+async def test_get_all_animals_etag_covers_co_owners(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    session: AsyncSession,
+):
+    co_owner = User(email="ciri@wiedzmin.pl", hashed_password="-")
+    session.add(co_owner)
+    await session.flush()
+    await session.execute(
+        insert(AnimalUserAssociation),
+        [{"animal_id": default_animal1.id, "user_id": co_owner.id}],
+    )
+    await session.commit()
+
+    url = app.url_path_for("get_all_animals")
+    response = await client.get(url, headers=default_user_headers)
+    assert len(response.json()["items"][0]["owners"]) == 2
+    etag = response.headers["ETag"]
+
+    await session.delete(co_owner)
+    await session.commit()
+    # the ETag is under test, not the response cache
+    await response_cache.clear()
+
+    response = await client.get(
+        url, headers={**default_user_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["items"][0]["owners"]) == 1
+
+
+async def test_get_all_animals_response_cache_invalidated_by_co_owner_deletion(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    session: AsyncSession,
+):
+    co_owner = User(email="ciri@wiedzmin.pl", hashed_password="-")
+    session.add(co_owner)
+    await session.flush()
+    await session.execute(
+        insert(AnimalUserAssociation),
+        [{"animal_id": default_animal1.id, "user_id": co_owner.id}],
+    )
+    await session.commit()
+
+    url = app.url_path_for("get_all_animals")
+    response = await client.get(url, headers=default_user_headers)
+    assert len(response.json()["items"][0]["owners"]) == 2
+
+    co_owner_token = security.create_jwt_token(co_owner.id, 60, refresh=False)[0]
+    response = await client.delete(
+        app.url_path_for("delete_current_user"),
+        headers={"Authorization": f"Bearer {co_owner_token}"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = await client.get(url, headers=default_user_headers)
+    assert len(response.json()["items"][0]["owners"]) == 1
+
+
+async def test_get_log_etag(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    response = await client.post(
+        app.url_path_for("add_log", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        json={"comments": "", "activity": "Food", "date": datetime.now().isoformat()},
+    )
+    log_id = response.json()["id"]
+
+    url = app.url_path_for("get_log", animal_id=default_animal1.id)
+    response = await client.get(url, headers=default_user_headers)
+    etag = response.headers["ETag"]
+    response = await client.get(
+        url, headers={**default_user_headers, "If-None-Match": f'W/{etag}, "other"'}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = await client.put(
+        app.url_path_for("update_log", log_id=log_id),
+        headers=default_user_headers,
+        json={
+            "comments": "edited",
+            "activity": "Food",
+            "date": datetime.now().isoformat(),
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.get(
+        url, headers={**default_user_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["items"][0]["comments"] == "edited"
+
+
+async def test_get_log_response_cache(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    url = app.url_path_for("get_log", animal_id=default_animal1.id)
+    first = await client.get(url, headers=default_user_headers)
+    assert first.status_code == status.HTTP_200_OK
+
+    hits = response_cache.hits.value
+    with record_statements() as statements:
+        second = await client.get(url, headers=default_user_headers)
+    assert response_cache.hits.value == hits + 1
+    assert not [s for s in statements if "animal_log" in s]
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["content-type"] == "application/json"
+
+    response = await client.post(
+        app.url_path_for("add_log", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        json={"comments": "", "activity": "Food", "date": datetime.now().isoformat()},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.get(url, headers=default_user_headers)
+    assert len(response.json()["items"]) == 1
+
+
+async def test_get_all_animals_response_cache_invalidated_by_update(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    url = app.url_path_for("get_all_animals")
+    response = await client.get(url, headers=default_user_headers)
+    assert response.json()["items"][0]["name"] == default_animal1.name
+
+    response = await client.patch(
+        app.url_path_for("update_animal", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        json={
+            "identifier": None,
+            "name": "Renamed",
+            "sex": None,
+            "height": None,
+            "animal_types": "Dog",
+            "color": None,
+            "description": None,
+            "image": None,
+            "date_of_death": None,
+            "active": True,
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.get(url, headers=default_user_headers)
+    assert response.json()["items"][0]["name"] == "Renamed"
+
+
+@pytest.fixture
+async def replica(monkeypatch) -> AsyncGenerator[ReplicaSet, None]:
+    """The test database again, as if it was a read replica"""
+    replicas = ReplicaSet(
+        [async_engine.url.render_as_string(hide_password=False)], retry_interval=30
+    )
+    monkeypatch.setattr(deps, "replicas", replicas)
+    yield replicas
+    await replicas.engines[0].dispose()
+
+
+async def test_get_log_reads_from_replica(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    replica: ReplicaSet,
+):
+    with record_statements() as primary, record_statements(
+        replica.engines[0]
+    ) as secondary:
+        response = await client.get(
+            app.url_path_for("get_log", animal_id=default_animal1.id),
+            headers=default_user_headers,
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert [s for s in secondary if "FROM animal_log" in s]
+    assert not [s for s in primary if "FROM animal_log" in s]
+
+
+async def test_cached_read_does_not_connect_to_replica(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    replica: ReplicaSet,
+):
+    url = app.url_path_for("get_log", animal_id=default_animal1.id)
+    await client.get(url, headers=default_user_headers)
+    checkouts = []
+    event.listen(
+        replica.engines[0].sync_engine.pool,
+        "checkout",
+        lambda *args: checkouts.append(args),
+    )
+
+    response = await client.get(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert not checkouts
+
+
+async def test_reads_stay_on_primary_after_own_write(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    replica: ReplicaSet,
+):
+    url = app.url_path_for("get_log", animal_id=default_animal1.id)
+    await client.get(url, headers=default_user_headers)
+
+    response = await client.post(
+        app.url_path_for("add_log", animal_id=default_animal1.id),
+        headers=default_user_headers,
+        json={"comments": "", "activity": "Food", "date": datetime.now().isoformat()},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    with record_statements(replica.engines[0]) as secondary:
+        response = await client.get(url, headers=default_user_headers)
+    assert not secondary
+    assert len(response.json()["items"]) == 1
+
+
+async def test_dead_replica_falls_back_to_primary(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    monkeypatch,
+):
+    url = async_engine.url.set(host="127.0.0.1", port=1)
+    replicas = ReplicaSet([url.render_as_string(hide_password=False)], 30)
+    monkeypatch.setattr(deps, "replicas", replicas)
+
+    response = await client.get(
+        app.url_path_for("get_log", animal_id=default_animal1.id),
+        headers=default_user_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert replicas.pick() is None
+    await replicas.engines[0].dispose()
@@ -1,5 +1,7 @@
 from httpx import AsyncClient, codes
 
+from app.core import security
+from app.core.cache import token_cache
 from app.main import app
 from app.models import User
 from app.tests.conftest import default_user_email, default_user_password
@@ -62,3 +64,44 @@ async def test_auth_refresh_token(client: AsyncClient, default_user: User):
     assert "refresh_token" in token
     assert "refresh_token_expires_at" in token
     assert "refresh_token_issued_at" in token
+
+
+async def test_auth_access_token_hashes_in_executor(
+    client: AsyncClient, default_user: User
+):
+    hashed_before = security.HASHING_WAIT_SECONDS.count
+
+    response = await client.post(
+        app.url_path_for("login_access_token"),
+        data={
+            "username": default_user_email,
+            "password": default_user_password,
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == codes.OK
+    assert security.HASHING_WAIT_SECONDS.count == hashed_before + 1
+    assert security.HASHING_QUEUE_DEPTH.value == 0
+
+
+async def test_repeated_bearer_token_is_verified_once(
+    client: AsyncClient, default_user_headers
+):
+    await client.get(
+        app.url_path_for("read_current_user"), headers=default_user_headers
+    )
+    misses_before = token_cache.misses.value
+
+    response = await client.get(
+        app.url_path_for("read_current_user"), headers=default_user_headers
+    )
+    assert response.status_code == codes.OK
+    assert token_cache.misses.value == misses_before
+
+
+async def test_invalid_bearer_token(client: AsyncClient, default_user: User):
+    response = await client.get(
+        app.url_path_for("read_current_user"),
+        headers={"Authorization": "Bearer invalid"},
+    )
+    assert response.status_code == codes.FORBIDDEN
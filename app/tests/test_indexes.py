@@ -0,0 +1,146 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import and_, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    ActivityTypes,
+    Animal,
+    AnimalLog,
+    AnimalType,
+    AnimalUserAssociation,
+    AnimalWeightHistory,
+    User,
+)
+
+SEED_USERS = 300
+SEED_ANIMALS_PER_USER = 4
+SEED_ROWS_PER_ANIMAL = 20
+
+
+@pytest.fixture
+async def seeded_dataset(session: AsyncSession) -> tuple[str, str]:
+    """Seeds enough rows for the planner to prefer indexes, returns (user_id, animal_id)"""
+    now = datetime.now()
+    users, animals, associations, weights, logs = [], [], [], [], []
+    for user_number in range(SEED_USERS):
+        user_id = str(uuid.uuid4())
+        users.append(
+            {
+                "id": user_id,
+                "email": f"seed{user_number}@example.com",
+                "hashed_password": "x",
+            }
+        )
+        for _ in range(SEED_ANIMALS_PER_USER):
+            animal_id = str(uuid.uuid4())
+            animals.append(
+                {
+                    "id": animal_id,
+                    "name": "seed",
+                    "animal_types": AnimalType.Dog,
+                    "date_of_birth": now.date(),
+                }
+            )
+            associations.append(
+                {"id": str(uuid.uuid4()), "user_id": user_id, "animal_id": animal_id}
+            )
+            for days in range(SEED_ROWS_PER_ANIMAL):
+                change_date = now - timedelta(days=days)
+                weights.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "animal_id": animal_id,
+                        "weight": 1.0,
+                        "change_date": change_date,
+                    }
+                )
+                logs.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "animal_id": animal_id,
+                        "date": change_date,
+                        "activity": ActivityTypes.Food,
+                    }
+                )
+
+    await session.execute(insert(User), users)
+    await session.execute(insert(Animal), animals)
+    await session.execute(insert(AnimalUserAssociation), associations)
+    await session.execute(insert(AnimalWeightHistory), weights)
+    await session.execute(insert(AnimalLog), logs)
+    await session.commit()
+    for table in [
+        "user",
+        "animal",
+        "animal_user_association",
+        "animal_weight_history",
+        "animal_log",
+    ]:
+        await session.execute(text(f'ANALYZE "{table}"'))
+    return users[0]["id"], animals[0]["id"]
+
+
+async def explain(session: AsyncSession, statement) -> str:
+    compiled = statement.compile(
+        dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}
+    )
+    result = await session.execute(text(f"EXPLAIN {compiled}"))
+    return "\n".join(result.scalars().all())
+
+
+async def test_owned_animals_listing_uses_index(
+    session: AsyncSession, seeded_dataset: tuple[str, str]
+):
+    user_id, _ = seeded_dataset
+    plan = await explain(session, select(Animal).where(Animal.owners.any(id=user_id)))
+    assert "ix_animal_user_association_user_id_animal_id" in plan
+
+
+async def test_ownership_check_uses_index(
+    session: AsyncSession, seeded_dataset: tuple[str, str]
+):
+    user_id, animal_id = seeded_dataset
+    plan = await explain(
+        session,
+        select(Animal)
+        .where(Animal.owners.any(id=user_id))
+        .where(Animal.id == animal_id),
+    )
+    assert "using ix_animal_user_association_" in plan
+    assert "Seq Scan on animal_user_association" not in plan
+
+
+async def test_weight_history_window_uses_index(
+    session: AsyncSession, seeded_dataset: tuple[str, str]
+):
+    _, animal_id = seeded_dataset
+    plan = await explain(
+        session,
+        select(AnimalWeightHistory).where(
+            and_(
+                AnimalWeightHistory.animal_id == animal_id,
+                AnimalWeightHistory.change_date >= datetime.now() - timedelta(days=1),
+            )
+        ),
+    )
+    assert "ix_animal_weight_history_animal_id_change_date" in plan
+
+
+async def test_log_window_uses_index(
+    session: AsyncSession, seeded_dataset: tuple[str, str]
+):
+    _, animal_id = seeded_dataset
+    plan = await explain(
+        session,
+        select(AnimalLog).where(
+            and_(
+                AnimalLog.animal_id == animal_id,
+                AnimalLog.activity.in_([ActivityTypes.Food.name]),
+                AnimalLog.date >= datetime.now() - timedelta(days=1),
+            )
+        ),
+    )
+    assert "ix_animal_log_animal_id_date_activity" in plan
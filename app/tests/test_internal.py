@@ -0,0 +1,34 @@
+from httpx import AsyncClient, codes
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import config, security
+from app.main import app
+from app.models import User
+
+
+async def test_get_pool_status(client: AsyncClient, session: AsyncSession):
+    superuser = User(email=config.settings.FIRST_SUPERUSER_EMAIL, hashed_password="x")
+    session.add(superuser)
+    await session.commit()
+    access_token = security.create_jwt_token(superuser.id, 60, refresh=False)[0]
+
+    response = await client.get(
+        app.url_path_for("get_pool_status"),
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == codes.OK
+    pool_status = response.json()
+    assert pool_status["size"] == config.settings.DATABASE_POOL_SIZE
+    # the request session holds one
+    assert pool_status["checked_out"] >= 1
+    assert pool_status["checkout_count"] >= 1
+    assert pool_status["checkout_seconds_buckets"][-1]["le"] == 10.0
+
+
+async def test_get_pool_status_requires_superuser(
+    client: AsyncClient, default_user_headers
+):
+    response = await client.get(
+        app.url_path_for("get_pool_status"), headers=default_user_headers
+    )
+    assert response.status_code == codes.FORBIDDEN
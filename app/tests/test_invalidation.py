@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+from httpx import AsyncClient, codes
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import invalidation
+from app.core.cache import user_cache
+from app.core.session import async_engine
+from app.main import app
+from app.models import Animal, User
+from app.tests.conftest import record_statements
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met in time")
+
+
+async def test_publish_notifies_on_commit_only(session: AsyncSession):
+    received = []
+    async with async_engine.connect() as connection:
+        raw = await connection.get_raw_connection()
+        listener = raw.driver_connection
+        await listener.add_listener(
+            invalidation.CHANNEL, lambda *args: received.append(json.loads(args[3]))
+        )
+
+        invalidation.publish(session, "log", "rolled-back")
+        await session.execute(text("SELECT 1"))
+        await session.rollback()
+        invalidation.publish(session, "user", "committed", 3)
+        await session.execute(text("SELECT 1"))
+        await session.commit()
+
+        await wait_for(lambda: received)
+        await connection.invalidate()
+
+    assert [(event["e"], event["id"], event["v"]) for event in received] == [
+        ("user", "committed", 3)
+    ]
+    assert received[0]["o"] == invalidation.ORIGIN
+
+
+async def test_commit_sends_events_in_one_statement(session: AsyncSession):
+    received = []
+    async with async_engine.connect() as connection:
+        raw = await connection.get_raw_connection()
+        listener = raw.driver_connection
+        await listener.add_listener(
+            invalidation.CHANNEL, lambda *args: received.append(json.loads(args[3]))
+        )
+
+        for id in ("first", "second", "third"):
+            invalidation.publish(session, "user", id)
+        await session.execute(text("SELECT 1"))
+        with record_statements() as statements:
+            await session.commit()
+
+        await wait_for(lambda: len(received) == 3)
+        await connection.invalidate()
+
+    assert sum("pg_notify" in statement for statement in statements) == 1
+    assert sorted(event["id"] for event in received) == ["first", "second", "third"]
+
+
+async def test_orm_only_write_notifies_writer(
+    client: AsyncClient,
+    default_user: User,
+    default_user_headers,
+    default_animal1: Animal,
+):
+    received = []
+    async with async_engine.connect() as connection:
+        raw = await connection.get_raw_connection()
+        listener = raw.driver_connection
+        await listener.add_listener(
+            invalidation.CHANNEL, lambda *args: received.append(json.loads(args[3]))
+        )
+
+        # flushed by commit itself, no Core statement marks the writer
+        response = await client.post(
+            app.url_path_for("add_weight", animal_id=default_animal1.id),
+            headers=default_user_headers,
+            json={"weight": 10, "change_date": "2023-01-01T00:00:00"},
+        )
+        assert response.status_code == codes.OK
+
+        await wait_for(lambda: received)
+        # both sent by the one NOTIFY statement of the commit
+        await asyncio.sleep(0.05)
+        await connection.invalidate()
+
+    assert {(event["e"], event["id"]) for event in received} == {
+        ("weight", default_animal1.id),
+        ("writer", default_user.id),
+    }
+
+
+async def test_listener_applies_other_workers_events(session: AsyncSession):
+    listener = invalidation.InvalidationListener(retry_interval=0.05)
+    listener.start()
+    try:
+        await wait_for(lambda: invalidation.LISTENER_CONNECTED.value == 1)
+        user_cache.set("other-worker-user", object())
+        lag_count = invalidation.LAG_SECONDS.count
+
+        payload = {"e": "user", "id": "other-worker-user", "v": 2, "t": 0, "o": "x"}
+        await session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": invalidation.CHANNEL, "payload": json.dumps(payload)},
+        )
+        await session.commit()
+
+        await wait_for(lambda: user_cache.get("other-worker-user") is None)
+        assert invalidation.LAG_SECONDS.count == lag_count + 1
+    finally:
+        await listener.stop()
+
+
+async def test_listener_stays_out_of_the_pool():
+    listener = invalidation.InvalidationListener(retry_interval=0.05)
+    listener.start()
+    try:
+        await wait_for(lambda: invalidation.LISTENER_CONNECTED.value == 1)
+        assert async_engine.pool.checkedout() == 0
+    finally:
+        await listener.stop()
+
+
+async def test_listener_reconnects(session: AsyncSession):
+    listener = invalidation.InvalidationListener(retry_interval=0.05)
+    listener.start()
+    try:
+        await wait_for(lambda: invalidation.LISTENER_CONNECTED.value == 1)
+        reconnects = invalidation.RECONNECTS.value
+
+        await session.execute(
+            text(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE query LIKE 'LISTEN %' AND pid <> pg_backend_pid()"
+            )
+        )
+        await session.commit()
+
+        await wait_for(lambda: invalidation.RECONNECTS.value == reconnects + 1)
+        await wait_for(lambda: invalidation.LISTENER_CONNECTED.value == 1)
+    finally:
+        await listener.stop()
@@ -0,0 +1,68 @@
+from httpx import AsyncClient, codes
+
+from app.core import metrics
+from app.main import app
+from app.models import Animal
+
+
+def test_render_prometheus_text():
+    requests = metrics.Family(
+        "requests_total",
+        "Requests",
+        ("route",),
+        lambda: metrics.Counter("requests_total", "Requests"),
+    )
+    requests.labels('/a"b').inc(2)
+    latency = metrics.Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    latency.observe(0.5)
+
+    text = metrics.render({"requests_total": requests, "latency_seconds": latency})
+
+    assert text.splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 0',
+        'latency_seconds_bucket{le="1.0"} 1',
+        'latency_seconds_bucket{le="+Inf"} 1',
+        "latency_seconds_sum 0.5",
+        "latency_seconds_count 1",
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 2.0',
+    ]
+
+
+def sample(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} not exported")
+
+
+async def test_metrics_report_route_database_work(
+    client: AsyncClient, default_user_headers, default_animal1: Animal
+):
+    labels = '{method="GET",route="/animals/weight/{animal_id}"}'
+    before = (await client.get("/metrics")).text
+    if f"http_request_db_statements_count{labels}" in before:
+        count = sample(before, f"http_request_db_statements_count{labels}")
+        statements = sample(before, f"http_request_db_statements_sum{labels}")
+    else:
+        count = statements = 0
+
+    response = await client.get(
+        app.url_path_for("get_weight_history", animal_id=default_animal1.id),
+        headers=default_user_headers,
+    )
+    assert response.status_code == codes.OK
+
+    response = await client.get("/metrics")
+    assert response.status_code == codes.OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = response.text
+    assert sample(after, f"http_request_db_statements_count{labels}") == count + 1
+    # principal, ownership, fingerprint and page
+    assert sample(after, f"http_request_db_statements_sum{labels}") - statements >= 4
+    assert sample(after, f"http_request_db_seconds_count{labels}") >= 1
+    status_labels = '{method="GET",route="/animals/weight/{animal_id}",status="200"}'
+    assert sample(after, f"http_requests_total{status_labels}") >= 1
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import queries
+from app.models import ActivityTypes, Animal, AnimalLog
+from app.tests.conftest import record_statements
+
+
+async def test_log_page_binds_new_values_on_reuse(
+    default_animal1: Animal, session: AsyncSession
+):
+    now = datetime.now()
+    for days, activity in enumerate([ActivityTypes.Food, ActivityTypes.Bath] * 2):
+        session.add(
+            AnimalLog(
+                animal_id=default_animal1.id,
+                date=now - timedelta(days=days),
+                activity=activity,
+            )
+        )
+        await session.commit()
+
+    start_date = now - timedelta(days=30)
+    for names, expected in [(["Food"], 2), (["Bath"], 2), (["Food", "Bath"], 4)]:
+        result = await session.execute(
+            *queries.log_page(default_animal1.id, start_date, names, 10, None)
+        )
+        logs = result.scalars().all()
+        assert len(logs) == expected
+        assert {log.activity.name for log in logs} == set(names)
+
+    result = await session.execute(
+        *queries.log_page(default_animal1.id, start_date, [], 10, None)
+    )
+    newest, *rest = result.scalars().all()
+    result = await session.execute(
+        *queries.log_page(
+            default_animal1.id, start_date, [], 10, (newest.date, newest.id)
+        )
+    )
+    assert [log.id for log in result.scalars().all()] == [log.id for log in rest]
+
+
+async def test_activity_filter_renders_one_statement(
+    default_animal1: Animal, session: AsyncSession
+):
+    start_date = datetime.now() - timedelta(days=1)
+    with record_statements() as statements:
+        for names in [["Food"], ["Food", "Bath"], ["Food", "Bath", "Urine"]]:
+            await session.execute(
+                *queries.log_page(default_animal1.id, start_date, names, 10, None)
+            )
+    assert len(set(statements)) == 1
@@ -0,0 +1,13 @@
+import pytest
+from sqlalchemy import literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def test_query_budget_lists_statements(session: AsyncSession, query_budget):
+    with pytest.raises(pytest.fail.Exception) as failure:
+        with query_budget(1):
+            await session.execute(select(literal(1)))
+            await session.execute(select(literal(2)))
+    message = str(failure.value)
+    assert "2 SQL statements executed, budget is 1" in message
+    assert "1. SELECT $1::INTEGER" in message
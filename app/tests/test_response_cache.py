@@ -0,0 +1,50 @@
+from app.core.response_cache import CachedResponse, MemoryBackend, ResponseCache
+
+
+async def test_invalidate_changes_key():
+    cache = ResponseCache(MemoryBackend(max_bytes=1024), ttl=60)
+    key = await cache.key(["log:1"], "log", 1)
+    await cache.set(key, CachedResponse('"a"', b"[]"))
+    assert await cache.get(key) == CachedResponse('"a"', b"[]")
+    assert await cache.key(["log:1"], "log", 1) == key
+
+    await cache.invalidate("log:1")
+    assert await cache.key(["log:1"], "log", 1) != key
+    assert await cache.key(["log:2"], "log", 1) != key
+
+
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_bytes=10)
+    await backend.set("a", CachedResponse("a", b"1234"), ttl=60)
+    await backend.set("b", CachedResponse("b", b"1234"), ttl=60)
+    await backend.get("a")
+    await backend.set("c", CachedResponse("c", b"1234"), ttl=60)
+
+    assert await backend.get("b") is None
+    assert await backend.get("a") is not None
+    assert await backend.get("c") is not None
+    assert backend.size == 8
+
+    # larger than the whole cache, never stored
+    await backend.set("d", CachedResponse("d", b"x" * 11), ttl=60)
+    assert await backend.get("d") is None
+
+
+async def test_memory_backend_expires_entries():
+    backend = MemoryBackend(max_bytes=10)
+    await backend.set("a", CachedResponse("a", b"1234"), ttl=0)
+    assert await backend.get("a") is None
+    assert backend.size == 0
+
+
+async def test_memory_backend_forgets_old_generations():
+    backend = MemoryBackend(max_bytes=10, generation_ttl=0)
+    await backend.bump("log:1")
+    await backend.bump("log:2")
+    assert len(backend._generations) == 0
+    assert await backend.generation("log:1") == 0
+
+    backend.generation_ttl = 60
+    await backend.bump("log:1")
+    assert await backend.generation("log:1") > 0
+    assert list(backend._generations) == ["log:1"]
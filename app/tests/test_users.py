@@ -1,9 +1,10 @@
 from httpx import AsyncClient, codes
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import user_cache
 from app.main import app
-from app.models import User
+from app.models import Animal, AnimalUserAssociation, User
 from app.tests.conftest import (
     default_user_email,
     default_user_id,
@@ -11,10 +12,13 @@ from app.tests.conftest import (
 )
 
 
-async def test_read_current_user(client: AsyncClient, default_user_headers):
-    response = await client.get(
-        app.url_path_for("read_current_user"), headers=default_user_headers
-    )
+async def test_read_current_user(
+    client: AsyncClient, default_user_headers, query_budget
+):
+    with query_budget(1):
+        response = await client.get(
+            app.url_path_for("read_current_user"), headers=default_user_headers
+        )
     assert response.status_code == codes.OK
     assert response.json() == {
         "id": default_user_id,
@@ -22,26 +26,117 @@ async def test_read_current_user(client: AsyncClient, default_user_headers):
     }
 
 
+async def test_read_current_user_is_cached(
+    client: AsyncClient, default_user_headers, query_budget
+):
+    await client.get(
+        app.url_path_for("read_current_user"), headers=default_user_headers
+    )
+    hits_before = user_cache.hits.value
+
+    with query_budget(0):
+        response = await client.get(
+            app.url_path_for("read_current_user"), headers=default_user_headers
+        )
+    assert response.status_code == codes.OK
+    assert user_cache.hits.value == hits_before + 1
+
+
+async def test_update_current_user_invalidates_cache(
+    client: AsyncClient, default_user_headers
+):
+    await client.get(
+        app.url_path_for("read_current_user"), headers=default_user_headers
+    )
+    assert user_cache.get(default_user_id) is not None
+
+    response = await client.patch(
+        app.url_path_for("update_user"),
+        headers=default_user_headers,
+        json={"first_name": "qwe"},
+    )
+    assert response.status_code == codes.OK
+    assert user_cache.get(default_user_id) is None
+
+
+async def test_read_current_user_etag(client: AsyncClient, default_user_headers):
+    url = app.url_path_for("read_current_user")
+    response = await client.get(url, headers=default_user_headers)
+    etag = response.headers["ETag"]
+
+    response = await client.get(
+        url, headers={**default_user_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == codes.NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    response = await client.patch(
+        app.url_path_for("update_user"),
+        headers=default_user_headers,
+        json={"first_name": "qwe"},
+    )
+    assert response.status_code == codes.OK
+
+    response = await client.get(
+        url, headers={**default_user_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == codes.OK
+    assert response.headers["ETag"] != etag
+
+
 async def test_delete_current_user(
-    client: AsyncClient, default_user_headers, session: AsyncSession
+    client: AsyncClient, default_user_headers, session: AsyncSession, query_budget
+):
+    with query_budget(4):
+        response = await client.delete(
+            app.url_path_for("delete_current_user"), headers=default_user_headers
+        )
+    assert response.status_code == codes.NO_CONTENT
+    result = await session.execute(select(User).where(User.id == default_user_id))
+    user = result.scalars().first()
+    assert user is None
+
+
+async def test_delete_current_user_keeps_co_owned_animals(
+    client: AsyncClient,
+    default_user_headers,
+    default_animal1: Animal,
+    session: AsyncSession,
 ):
+    co_owner = User(email="ciri@wiedzmin.pl", hashed_password="-")
+    session.add(co_owner)
+    await session.flush()
+    await session.execute(
+        insert(AnimalUserAssociation),
+        [{"animal_id": default_animal1.id, "user_id": co_owner.id}],
+    )
+    await session.commit()
+
     response = await client.delete(
         app.url_path_for("delete_current_user"), headers=default_user_headers
     )
     assert response.status_code == codes.NO_CONTENT
+
+    result = await session.execute(
+        select(AnimalUserAssociation.user_id).where(
+            AnimalUserAssociation.animal_id == default_animal1.id
+        )
+    )
+    assert result.scalars().all() == [co_owner.id]
     result = await session.execute(select(User).where(User.id == default_user_id))
-    user = result.scalars().first()
-    assert user is None
+    assert result.scalars().first() is None
 
 
 async def test_reset_current_user_password(
-    client: AsyncClient, default_user_headers, session: AsyncSession
+    client: AsyncClient, default_user_headers, session: AsyncSession, query_budget
 ):
-    response = await client.post(
-        app.url_path_for("reset_current_user_password"),
-        headers=default_user_headers,
-        json={"password": "testxxxxxx"},
-    )
+    with query_budget(3):
+        response = await client.post(
+            app.url_path_for("reset_current_user_password"),
+            headers=default_user_headers,
+            json={"password": "testxxxxxx"},
+        )
     assert response.status_code == codes.OK
     result = await session.execute(select(User).where(User.id == default_user_id))
     user = result.scalars().first()
@@ -50,16 +145,17 @@ async def test_reset_current_user_password(
 
 
 async def test_register_new_user(
-    client: AsyncClient, default_user_headers, session: AsyncSession
+    client: AsyncClient, default_user_headers, session: AsyncSession, query_budget
 ):
-    response = await client.post(
-        app.url_path_for("register_new_user"),
-        headers=default_user_headers,
-        json={
-            "email": "qwe@example.com",
-            "password": "asdasdasd",
-        },
-    )
+    with query_budget(2):
+        response = await client.post(
+            app.url_path_for("register_new_user"),
+            headers=default_user_headers,
+            json={
+                "email": "qwe@example.com",
+                "password": "asdasdasd",
+            },
+        )
     assert response.status_code == codes.OK
     result = await session.execute(select(User).where(User.email == "qwe@example.com"))
     user = result.scalars().first()
@@ -67,23 +163,24 @@ async def test_register_new_user(
 
 
 async def test_update_current_user(
-    client: AsyncClient, default_user_headers, session: AsyncSession
+    client: AsyncClient, default_user_headers, session: AsyncSession, query_budget
 ):
-    response = await client.patch(
-        app.url_path_for("update_user"),
-        headers=default_user_headers,
-        json={
-            "first_name": "qwe",
-            "last_name": "qwe",
-            "mobile_number": "qwe",
-            "road": "qwe",
-            "city": "qwe",
-            "state": "qwe",
-            "zip": "qwe",
-            "country": "qwe",
-            "phone_number": "qwe",
-        },
-    )
+    with query_budget(3):
+        response = await client.patch(
+            app.url_path_for("update_user"),
+            headers=default_user_headers,
+            json={
+                "first_name": "qwe",
+                "last_name": "qwe",
+                "mobile_number": "qwe",
+                "road": "qwe",
+                "city": "qwe",
+                "state": "qwe",
+                "zip": "qwe",
+                "country": "qwe",
+                "phone_number": "qwe",
+            },
+        )
     assert response.status_code == codes.OK
     result = await session.execute(select(User).where(User.id == default_user_id))
     user = result.scalars().first()
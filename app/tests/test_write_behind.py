@@ -0,0 +1,124 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.write_behind import DROPPED_ROWS, WriteBehindQueue
+from app.models import ActivityTypes, Animal, AnimalLog
+
+
+def log_row(animal_id: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "animal_id": animal_id,
+        "date": datetime.now(),
+        "activity": ActivityTypes.Food,
+        "comments": None,
+    }
+
+
+async def test_flushes_batches_on_drain(default_animal1: Animal, session: AsyncSession):
+    queue = WriteBehindQueue(maxsize=100, batch_size=10, flush_interval=60)
+    rows = [log_row(default_animal1.id) for _ in range(25)]
+    for row in rows:
+        queue.submit(row)
+
+    await queue.drain()
+    assert len(queue) == 0
+
+    result = await session.execute(select(AnimalLog.id))
+    assert sorted(result.scalars().all()) == sorted(row["id"] for row in rows)
+
+
+async def test_flushes_after_interval(default_animal1: Animal, session: AsyncSession):
+    queue = WriteBehindQueue(maxsize=100, batch_size=10, flush_interval=0.01)
+    row = log_row(default_animal1.id)
+    queue.submit(row)
+
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        result = await session.execute(select(AnimalLog.id))
+        if result.scalars().all():
+            break
+    result = await session.execute(select(AnimalLog.id))
+    assert result.scalars().all() == [row["id"]]
+    await queue.drain()
+
+
+async def test_rejects_when_full(default_animal1: Animal):
+    queue = WriteBehindQueue(maxsize=1, batch_size=10, flush_interval=60)
+    queue.submit(log_row(default_animal1.id))
+    with pytest.raises(asyncio.QueueFull):
+        queue.submit(log_row(default_animal1.id))
+    await queue.drain()
+
+
+async def test_drops_only_rejected_rows(default_animal1: Animal, session: AsyncSession):
+    queue = WriteBehindQueue(maxsize=100, batch_size=10, flush_interval=60)
+    dropped = DROPPED_ROWS.value
+    good = [log_row(default_animal1.id) for _ in range(3)]
+    for row in [*good[:2], log_row(str(uuid.uuid4())), good[2]]:
+        queue.submit(row)
+
+    await queue.drain()
+
+    assert DROPPED_ROWS.value == dropped + 1
+    result = await session.execute(select(AnimalLog.id))
+    assert sorted(result.scalars().all()) == sorted(row["id"] for row in good)
+
+
+async def test_retries_transient_errors_in_slow_path(
+    default_animal1: Animal, session: AsyncSession
+):
+    queue = WriteBehindQueue(maxsize=100, batch_size=10, flush_interval=0.01)
+    insert = queue._insert
+    calls = 0
+
+    async def flaky_insert(rows):
+        nonlocal calls
+        calls += 1
+        # the batch fails on the bad row, then the connection drops once
+        if calls == 2:
+            raise OperationalError("INSERT", {}, ConnectionError("connection lost"))
+        await insert(rows)
+
+    queue._insert = flaky_insert
+    dropped = DROPPED_ROWS.value
+    good = [log_row(default_animal1.id) for _ in range(2)]
+    for row in [good[0], log_row(str(uuid.uuid4())), good[1]]:
+        queue.submit(row)
+
+    await queue._queue.join()
+    assert not queue._worker.done()
+    await queue.drain()
+
+    assert DROPPED_ROWS.value == dropped + 1
+    result = await session.execute(select(AnimalLog.id))
+    assert sorted(result.scalars().all()) == sorted(row["id"] for row in good)
+
+
+async def test_worker_survives_unexpected_errors(
+    default_animal1: Animal, session: AsyncSession
+):
+    queue = WriteBehindQueue(maxsize=100, batch_size=1, flush_interval=60)
+    flush = queue._flush
+
+    async def broken_once(batch):
+        queue._flush = flush
+        raise RuntimeError("bug")
+
+    queue._flush = broken_once
+    dropped = DROPPED_ROWS.value
+    queue.submit(log_row(default_animal1.id))
+    await queue._queue.join()
+    row = log_row(default_animal1.id)
+    queue.submit(row)
+    await queue.drain()
+
+    assert DROPPED_ROWS.value == dropped + 1
+    result = await session.execute(select(AnimalLog.id))
+    assert result.scalars().all() == [row["id"]]
@@ -1,3 +1,14 @@
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.invalidation import publish
+from app.models import ActivityTypes, AnimalLogDaily, AnimalUserAssociation, User
+
+
 async def update_record(session, record, new_values):
     # Update the record's fields with the new values
     for field, new_value in new_values.items():
@@ -7,5 +18,60 @@ async def update_record(session, record, new_values):
     record.version += 1
     print(record.version)
 
+    # Drop stale cached snapshots in every worker, see `deps.get_current_user`
+    if isinstance(record, User):
+        publish(session, "user", record.id, record.version)
+
     # Commit the changes
     await session.commit()
+
+
+async def publish_co_owners(session, user_id: str) -> None:
+    """Invalidates `GET /animals/all` of the user and everyone sharing an animal
+    with them, listed animals embed their owners"""
+    shared = select(AnimalUserAssociation.animal_id).where(
+        AnimalUserAssociation.user_id == user_id
+    )
+    result = await session.execute(
+        select(AnimalUserAssociation.user_id)
+        .where(AnimalUserAssociation.animal_id.in_(shared))
+        .distinct()
+    )
+    for owner_id in result.scalars():
+        publish(session, "user_animals", owner_id)
+
+
+async def update_log_daily(
+    session, changes: Iterable[tuple[str, datetime, ActivityTypes | str, int]]
+):
+    """Applies `(animal_id, date, activity, delta)` log changes to the
+    `animal_log_daily` rollup. Does not commit, so the rollup is written in the
+    same transaction as the logs."""
+    deltas = Counter()
+    for animal_id, date, activity_or_name, delta in changes:
+        activity = (
+            ActivityTypes[activity_or_name]
+            if isinstance(activity_or_name, str)
+            else activity_or_name
+        )
+        deltas[(str(animal_id), date.date(), activity)] += delta
+
+    # sorted so concurrent writers lock rollup rows in the same order
+    rows = [
+        {"animal_id": animal_id, "day": day, "activity": activity, "count": delta}
+        for (animal_id, day, activity), delta in sorted(
+            deltas.items(), key=lambda item: (*item[0][:2], item[0][2].name)
+        )
+        if delta
+    ]
+    if not rows:
+        return
+
+    statement = pg_insert(AnimalLogDaily)
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["animal_id", "day", "activity"],
+            set_={"count": AnimalLogDaily.count + statement.excluded.count},
+        ),
+        rows,
+    )
@@ -0,0 +1,6 @@
+"""
+Benchmarks, not collected by pytest.
+
+Run a single benchmark as module from the project root, for example:
+python -m benchmarks.auth_token
+"""
@@ -0,0 +1,402 @@
+"""
+HTTP load test of the API: throughput and p50/p95/p99 latency per endpoint under
+concurrent clients logging in, listing animals and adding and reading weight
+history and logs.
+
+Seeds its own users, animals, weights and logs into the database configured in
+`.env` (apply migrations first) and replaces them on every run, other rows are
+not touched. By default drives the app in process through httpx with the
+lifespan running, `--url` targets a running server instead, e.g. uvicorn with
+several workers. Prints a JSON report, keep one per release and pass it as
+`--baseline` to the next run: the exit status is 1 when the p95 latency of any
+endpoint grew by more than `--tolerance`.
+
+python -m benchmarks.http_load --duration 30 --output baseline.json
+python -m benchmarks.http_load --duration 30 --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+import httpx
+from sqlalchemy import delete, insert, select
+
+from app.core import config, security
+from app.core.session import async_session
+from app.main import app
+from app.models import (
+    ActivityTypes,
+    Animal,
+    AnimalLog,
+    AnimalType,
+    AnimalUserAssociation,
+    AnimalWeightHistory,
+    User,
+)
+
+EMAIL_DOMAIN = "load.benchmark.example"
+PASSWORD = "benchmark"
+PERCENTILES = (50, 95, 99)
+
+# relative frequency of the actions a logged in client picks between requests
+MIX = {
+    "list_animals": 2,
+    "read_weight": 3,
+    "add_weight": 1,
+    "read_log": 3,
+    "add_log": 1,
+}
+
+
+@dataclass
+class Account:
+    email: str
+    animal_ids: list[str]
+
+
+@dataclass
+class Recorder:
+    """Latencies and errors per endpoint, labelled like `/metrics` routes"""
+
+    recording: bool = False
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    async def request(
+        self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs
+    ) -> httpx.Response | None:
+        started_at = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - started_at
+        if self.recording:
+            self.latencies[endpoint].append(elapsed)
+            if response is None or response.is_error:
+                self.errors[endpoint] += 1
+        return response
+
+
+async def seed(
+    users: int, animals: int, rows: int, rng: random.Random
+) -> list[Account]:
+    """Replaces benchmark users with `users` fresh ones owning `animals` animals
+    with `rows` weights and logs each, spread over the last 30 days."""
+    hashed_password = security.get_password_hash(PASSWORD)
+    now = datetime.now()
+    activities = list(ActivityTypes)
+    accounts, user_rows, animal_rows, owner_rows = [], [], [], []
+    weight_rows, log_rows = [], []
+
+    for i in range(users):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        email = f"user{i}@{EMAIL_DOMAIN}"
+        user_rows.append(
+            {"id": user_id, "email": email, "hashed_password": hashed_password}
+        )
+        account = Account(email, [])
+        for j in range(animals):
+            animal_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            account.animal_ids.append(animal_id)
+            animal_rows.append(
+                {
+                    "id": animal_id,
+                    "name": f"Animal {i}-{j}",
+                    "animal_types": rng.choice(list(AnimalType)),
+                    "date_of_birth": date(2020, 1, 1)
+                    + timedelta(days=rng.randrange(1000)),
+                }
+            )
+            owner_rows.append({"animal_id": animal_id, "user_id": user_id})
+            for _ in range(rows):
+                at = now - timedelta(minutes=rng.randrange(30 * 24 * 60))
+                weight_rows.append(
+                    {
+                        "animal_id": animal_id,
+                        "weight": round(rng.uniform(2, 40), 2),
+                        "change_date": at,
+                    }
+                )
+                log_rows.append(
+                    {
+                        "animal_id": animal_id,
+                        "date": at,
+                        "activity": rng.choice(activities),
+                        "comments": "seeded",
+                    }
+                )
+        accounts.append(account)
+
+    async with async_session() as session:
+        seeded = select(User.id).where(User.email.endswith(f"@{EMAIL_DOMAIN}"))
+        owned = select(AnimalUserAssociation.animal_id).where(
+            AnimalUserAssociation.user_id.in_(seeded)
+        )
+        # weight history has no ON DELETE CASCADE, logs and ownership do
+        await session.execute(
+            delete(AnimalWeightHistory).where(AnimalWeightHistory.animal_id.in_(owned))
+        )
+        await session.execute(delete(Animal).where(Animal.id.in_(owned)))
+        await session.execute(delete(User).where(User.id.in_(seeded)))
+        # Core inserts, ORM bulk inserts trip over the sentinel column check
+        for table, values in [
+            (User.__table__, user_rows),
+            (Animal.__table__, animal_rows),
+            (AnimalUserAssociation.__table__, owner_rows),
+            (AnimalWeightHistory.__table__, weight_rows),
+            (AnimalLog.__table__, log_rows),
+        ]:
+            if values:
+                await session.execute(insert(table), values)
+        await session.commit()
+    return accounts
+
+
+async def login(
+    client: httpx.AsyncClient, recorder: Recorder, account: Account
+) -> dict:
+    response = await recorder.request(
+        client,
+        "POST /auth/access-token",
+        "POST",
+        "/auth/access-token",
+        data={"username": account.email, "password": PASSWORD},
+    )
+    if response is None or response.is_error:
+        return {}
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def actions(
+    client: httpx.AsyncClient, recorder: Recorder, headers: dict, rng: random.Random
+) -> dict[str, Callable[[str], Awaitable]]:
+    def call(endpoint: str, url: str, **kwargs) -> Awaitable:
+        method = endpoint.split(" ", 1)[0]
+        return recorder.request(
+            client, endpoint, method, url, headers=headers, **kwargs
+        )
+
+    window = {"range": 30, "unit": "days"}
+    return {
+        "list_animals": lambda animal_id: call("GET /animals/all", "/animals/all"),
+        "read_weight": lambda animal_id: call(
+            "GET /animals/weight/{animal_id}",
+            f"/animals/weight/{animal_id}",
+            params=window,
+        ),
+        "add_weight": lambda animal_id: call(
+            "POST /animals/weight/{animal_id}",
+            f"/animals/weight/{animal_id}",
+            json={
+                "weight": round(rng.uniform(2, 40), 2),
+                "change_date": datetime.now().isoformat(),
+            },
+        ),
+        "read_log": lambda animal_id: call(
+            "GET /animals/log/{animal_id}", f"/animals/log/{animal_id}", params=window
+        ),
+        "add_log": lambda animal_id: call(
+            "POST /animals/log/{animal_id}",
+            f"/animals/log/{animal_id}",
+            json={
+                "comments": "benchmark",
+                "activity": rng.choice(list(ActivityTypes)).value,
+                "date": datetime.now().isoformat(),
+            },
+        ),
+    }
+
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    accounts: list[Account],
+    session_requests: int,
+    deadline: float,
+    rng: random.Random,
+) -> None:
+    """One virtual client: logs in as a random account, sends `session_requests`
+    requests picked from `MIX`, then starts over as another account."""
+    names, weights = list(MIX), list(MIX.values())
+    while time.perf_counter() < deadline:
+        account = rng.choice(accounts)
+        headers = await login(client, recorder, account)
+        if not headers:
+            continue
+        calls = actions(client, recorder, headers, rng)
+        for _ in range(session_requests):
+            if time.perf_counter() >= deadline:
+                return
+            name = rng.choices(names, weights)[0]
+            await calls[name](rng.choice(account.animal_ids))
+
+
+def percentile(ordered: list[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(latencies: list[float], errors: int, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / seconds, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+    for percent in PERCENTILES:
+        summary[f"p{percent}_ms"] = round(percentile(ordered, percent) * 1000, 2)
+    summary["max_ms"] = round(ordered[-1] * 1000, 2)
+    return summary
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> dict:
+    """Change of p95 latency and throughput per endpoint present in both reports,
+    as fractions of the baseline value."""
+    changes, regressions = {}, []
+    for endpoint, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if previous is None:
+            continue
+        p95 = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        throughput = (
+            current["throughput_rps"] / previous["throughput_rps"] - 1
+            if previous["throughput_rps"]
+            else 0.0
+        )
+        changes[endpoint] = {
+            "baseline_p95_ms": previous["p95_ms"],
+            "p95_change": round(p95, 4),
+            "throughput_change": round(throughput, 4),
+        }
+        if p95 > tolerance:
+            regressions.append(endpoint)
+    return {"tolerance": tolerance, "endpoints": changes, "regressions": regressions}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    started_at = datetime.now().isoformat(timespec="seconds")
+    print(f"seeding {args.users} users into the database", file=sys.stderr)
+    accounts = await seed(args.users, args.animals, args.rows, rng)
+
+    recorder = Recorder()
+    if args.url:
+        client = httpx.AsyncClient(
+            base_url=args.url,
+            limits=httpx.Limits(max_connections=args.concurrency),
+            timeout=30,
+        )
+    else:
+        client = httpx.AsyncClient(app=app, base_url="http://localhost", timeout=30)
+
+    async with client, app.router.lifespan_context(app):
+        deadline = time.perf_counter() + args.warmup + args.duration
+        clients = [
+            asyncio.create_task(
+                client_loop(
+                    client,
+                    recorder,
+                    accounts,
+                    args.session_requests,
+                    deadline,
+                    random.Random(rng.getrandbits(64)),
+                )
+            )
+            for _ in range(args.concurrency)
+        ]
+        print(f"warming up for {args.warmup}s", file=sys.stderr)
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        measured_from = time.perf_counter()
+        print(f"measuring for {args.duration}s", file=sys.stderr)
+        await asyncio.gather(*clients)
+        seconds = time.perf_counter() - measured_from
+
+    latencies = [value for values in recorder.latencies.values() for value in values]
+    if not latencies:
+        raise SystemExit("no requests completed, is the database migrated?")
+    return {
+        "version": config.settings.VERSION,
+        "python": platform.python_version(),
+        "started_at": started_at,
+        "target": args.url or "in-process",
+        "config": {
+            "users": args.users,
+            "animals": args.animals,
+            "rows": args.rows,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "session_requests": args.session_requests,
+            "seed": args.seed,
+            "mix": MIX,
+        },
+        "seconds": round(seconds, 2),
+        "total": summarize(latencies, sum(recorder.errors.values()), seconds),
+        "endpoints": {
+            endpoint: summarize(values, recorder.errors[endpoint], seconds)
+            for endpoint, values in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.http_load", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--url", help="running server, in process app when omitted")
+    parser.add_argument("--users", type=int, default=50, help="seeded users")
+    parser.add_argument("--animals", type=int, default=3, help="animals per user")
+    parser.add_argument(
+        "--rows", type=int, default=200, help="weights and logs per animal"
+    )
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds")
+    parser.add_argument(
+        "--session-requests",
+        type=int,
+        default=20,
+        help="requests a client sends before logging in as another user",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of data and mix")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report of a previous run to compare to")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed p95 growth over the baseline, 0.1 is 10%%",
+    )
+    return parser.parse_args(argv)
+
+
+async def main() -> int:
+    args = parse_args()
+    report = await run(args)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline"] = compare(report, json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 1 if report.get("baseline", {}).get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
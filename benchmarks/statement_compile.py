@@ -0,0 +1,96 @@
+"""
+Python side cost of turning the hot statements of one log read into SQL, for
+`select(...)` constructs rebuilt on every request and for the pre-built
+statements of `app/queries.py`. Runs the same `_compile_w_cache` step
+`Connection.execute` runs before talking to the database, no database needed.
+
+python -m benchmarks.statement_compile
+"""
+
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, select, tuple_
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+from sqlalchemy.util import LRUCache
+
+from app import queries
+from app.api.deps import owns_animal
+from app.core import config
+from app.models import AnimalLog, User
+
+ROUNDS = 5000
+
+Statements = Iterable[tuple[object, dict]]
+
+
+def rebuilt(user_id: str, animal_id: str, cursor: tuple[datetime, str]) -> Statements:
+    """Statements of GET /animals/log/{animal_id} as built per request before"""
+    start_date = datetime.now() - timedelta(days=30)
+    window = [
+        AnimalLog.animal_id == animal_id,
+        AnimalLog.date >= start_date,
+        AnimalLog.activity.in_(["Food", "Bath"]),
+    ]
+    yield select(User.active).where(User.id == user_id), {}
+    yield select(owns_animal(user_id, animal_id)), {}
+    yield select(
+        func.count(), func.max(AnimalLog.updated_at), func.sum(AnimalLog.version)
+    ).select_from(AnimalLog).where(*window), {}
+    yield (
+        select(AnimalLog)
+        .where(and_(*window))
+        .order_by(AnimalLog.date.desc(), AnimalLog.id.desc())
+        .limit(51)
+        .where(tuple_(AnimalLog.date, AnimalLog.id) < cursor)
+    ), {}
+
+
+def prebuilt(user_id: str, animal_id: str, cursor: tuple[datetime, str]) -> Statements:
+    """The same statements from `app/queries.py`"""
+    start_date = datetime.now() - timedelta(days=30)
+    names = ["Food", "Bath"]
+    yield queries.USER_ACTIVE_BY_ID, {"user_id": user_id}
+    yield queries.OWNS_ANIMAL, {"user_id": user_id, "animal_id": animal_id}
+    yield queries.log_fingerprint(animal_id, start_date, names)
+    yield queries.log_page(animal_id, start_date, names, 51, cursor)
+
+
+def measure(
+    rounds: int,
+    build: Callable[[str, str, tuple[datetime, str]], Statements],
+    compiled_cache: LRUCache | None,
+) -> float:
+    """Returns mean microseconds per request spent building and compiling."""
+    dialect = asyncpg_dialect()
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        user_id, animal_id = str(uuid.uuid4()), str(uuid.uuid4())
+        cursor = (datetime.now(), str(uuid.uuid4()))
+        for statement, params in build(user_id, animal_id, cursor):
+            statement._compile_w_cache(
+                dialect,
+                compiled_cache=compiled_cache,
+                column_keys=sorted(params),
+                for_executemany=False,
+                schema_translate_map=None,
+            )
+    return (time.perf_counter() - started_at) / rounds * 1_000_000
+
+
+def main() -> None:
+    size = config.settings.DATABASE_COMPILED_CACHE_SIZE
+    uncached = measure(ROUNDS, rebuilt, None)
+    before = measure(ROUNDS, rebuilt, LRUCache(size))
+    after = measure(ROUNDS, prebuilt, LRUCache(size))
+    print(f"rounds:                {ROUNDS}, 4 statements per request")
+    print(f"no compiled cache:     {uncached:8.2f} us/request")
+    print(f"rebuilt per request:   {before:8.2f} us/request")
+    print(f"app/queries.py:        {after:8.2f} us/request")
+    print(f"speedup:               {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()